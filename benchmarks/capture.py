@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Capture benchmark - PNG vs raw framebuffer screencap, and the H.264 stream backend.
+
+Works offline against recorded byte streams (what `adb exec-out screencap [-p]`
+printed), so it can run without a device:
+
+    python -m benchmarks.capture                       # synthesise streams from screen.png
+    python -m benchmarks.capture --png a.png --raw a.raw
+    python -m benchmarks.capture --record --device <ID> # save real streams for later runs
+    python -m benchmarks.capture --live --device <ID>   # include device round trips
+    python -m benchmarks.capture --stream rec.h264      # H.264 stream backend on a recording
+
+Record a stream with: adb exec-out screenrecord --output-format=h264 - > rec.h264
+"""
+import argparse
+import struct
+import subprocess
+import time
+
+import cv2
+
+import config
+from utils.frame import Frame, RAW_FORMAT_RGBA_8888
+
+
+def synthesise_streams(image_path):
+    """Build PNG and raw screencap byte streams from an image on disk."""
+    image = cv2.imread(image_path)
+    if image is None:
+        raise SystemExit(f"Could not load: {image_path}")
+    ok, png = cv2.imencode(".png", image)
+    if not ok:
+        raise SystemExit("PNG encode failed")
+    h, w = image.shape[:2]
+    rgba = cv2.cvtColor(image, cv2.COLOR_BGR2RGBA)
+    # Android 8+ header: width, height, format, colorspace
+    raw = struct.pack("<IIII", w, h, RAW_FORMAT_RGBA_8888, 0) + rgba.tobytes()
+    return png.tobytes(), raw
+
+
+def record_streams(device_id, png_path, raw_path):
+    """Save one PNG and one raw capture from a device."""
+    base = ["adb", "-s", device_id, "exec-out", "screencap"]
+    with open(png_path, "wb") as f:
+        f.write(subprocess.run(base + ["-p"], check=True, capture_output=True).stdout)
+    with open(raw_path, "wb") as f:
+        f.write(subprocess.run(base, check=True, capture_output=True).stdout)
+    print(f"Recorded {png_path} and {raw_path}")
+
+
+def time_it(fn, runs):
+    """Return (mean, min) seconds of ``fn`` over ``runs`` calls."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return sum(samples) / len(samples), min(samples)
+
+
+def bench_decode(png, raw, runs):
+    """Host-side cost of turning each stream into a BGR frame and a gray frame."""
+    rows = [
+        ("png -> bgr", lambda: Frame.from_png_bytes(png).image),
+        ("raw -> bgr", lambda: Frame.from_raw_bytes(raw).image),
+        ("png -> gray", lambda: Frame.from_png_bytes(png).gray),
+        ("raw -> gray", lambda: Frame.from_raw_bytes(raw).gray),
+        ("raw wrap only", lambda: Frame.from_raw_bytes(raw)),
+    ]
+    print(f"Stream sizes: png={len(png) / 1024:.0f} KiB raw={len(raw) / 1024:.0f} KiB")
+    for name, fn in rows:
+        mean, best = time_it(fn, runs)
+        print(f"  {name:<14} mean={mean * 1000:7.2f} ms  min={best * 1000:7.2f} ms")
+
+
+def bench_live(device_id, runs):
+    """End-to-end latency of each capture mode against a real device."""
+    from utils.device import DeviceController
+
+    for mode in ("png", "raw"):
+        device = DeviceController(device_id=device_id, capture_mode=mode)
+        mean, best = time_it(lambda: device.take_screenshot().image, runs)
+        print(f"  live {mode:<9} mean={mean * 1000:7.2f} ms  min={best * 1000:7.2f} ms")
+
+
+def bench_stream(path, runs):
+    """Decode throughput and take_screenshot latency of the stream backend on a recorded file."""
+    from utils.device import DeviceController
+    from utils.stream_capture import StreamCapture
+
+    stream = StreamCapture(source=path)
+    start = time.perf_counter()
+    stream.start()
+    stream.join()
+    elapsed = time.perf_counter() - start
+    if not stream.frames_decoded:
+        raise SystemExit(f"No frames decoded from {path}")
+    print(f"  decoded {stream.frames_decoded} frames in {elapsed:.2f}s "
+          f"({stream.frames_decoded / elapsed:.0f} fps, {elapsed / stream.frames_decoded * 1000:.2f} ms/frame)")
+
+    # Paced replay: how long a capture waits for the next frame of a 30 fps feed
+    device = DeviceController(device_id="replay", capture_mode="stream", stream_source=path,
+                              persistent_shell=False)
+    device.stream = StreamCapture(source=path, fps=30, loop=True)
+    device.stream.start()
+    device.take_screenshot()
+    mean, best = time_it(device.take_screenshot, runs)
+    print(f"  take_screenshot @30fps mean={mean * 1000:7.2f} ms  min={best * 1000:7.2f} ms")
+    device.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PNG vs raw screencap benchmark")
+    parser.add_argument("--png", help="Recorded `screencap -p` stream")
+    parser.add_argument("--raw", help="Recorded `screencap` stream")
+    parser.add_argument("--image", default=config.SCREENSHOT_NAME,
+                        help="Image used to synthesise streams when none are given")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--device", help="ADB device ID (for --record / --live)")
+    parser.add_argument("--record", action="store_true", help="Record streams to --png/--raw")
+    parser.add_argument("--live", action="store_true", help="Also time real device captures")
+    parser.add_argument("--stream", help="Recorded H.264 stream to benchmark the stream backend on")
+    args = parser.parse_args()
+
+    if args.stream:
+        print(f"Stream benchmark ({args.stream})")
+        bench_stream(args.stream, args.runs)
+        return
+
+    if args.record:
+        if not args.device:
+            raise SystemExit("--record needs --device")
+        record_streams(args.device, args.png or "capture.png.bin", args.raw or "capture.raw.bin")
+        return
+
+    if args.png and args.raw:
+        with open(args.png, "rb") as f:
+            png = f.read()
+        with open(args.raw, "rb") as f:
+            raw = f.read()
+    else:
+        png, raw = synthesise_streams(args.image)
+
+    print(f"Decode benchmark ({args.runs} runs)")
+    bench_decode(png, raw, args.runs)
+
+    if args.live:
+        if not args.device:
+            raise SystemExit("--live needs --device")
+        print(f"Live capture benchmark ({args.runs} runs)")
+        bench_live(args.device, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Digit recognizer benchmark - accuracy and latency vs EasyOCR on saved screenshots.
+
+Screenshots must show the base-search loot panel. Ground truth comes from a
+labels file ({"shot.png": {"gold": 123, "elixir": 456, "dark_elixir": 7}, ...})
+or, without one, from EasyOCR itself.
+
+    python -m benchmarks.digits shots/ --build            # build digit_bank.npz from the shots
+    python -m benchmarks.digits shots/ --labels labels.json
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import cv2
+
+import config
+from utils.digit_ocr import DigitRecognizer, build_bank
+from utils.text_detect_resource import RESOURCE_BBOXES, clamp_value, get_reader, parse_ocr_text, preprocess_for_ocr
+
+
+def load_shots(paths):
+    """Yield (name, image) for every screenshot in the given files/folders."""
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, "*.png"))) if os.path.isdir(path) else [path])
+    for path in files:
+        image = cv2.imread(path)
+        if image is not None:
+            yield os.path.basename(path), image
+
+
+def crops_of(image):
+    for resource, (x1, y1, x2, y2) in RESOURCE_BBOXES.items():
+        yield resource, image[y1:y2, x1:x2]
+
+
+def easyocr_value(crop, resource):
+    results = get_reader().readtext(preprocess_for_ocr(crop), detail=0)
+    return parse_ocr_text(results, resource)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Digit recognizer vs EasyOCR benchmark")
+    parser.add_argument("shots", nargs="+", help="Screenshot files or folders")
+    parser.add_argument("--labels", help="JSON ground truth per screenshot (default: EasyOCR output)")
+    parser.add_argument("--bank", default=config.DIGIT_BANK_PATH)
+    parser.add_argument("--build", action="store_true", help="Build the digit bank from the shots")
+    parser.add_argument("--min-confidence", type=float, default=config.DIGIT_MIN_CONFIDENCE)
+    args = parser.parse_args()
+
+    labels = {}
+    if args.labels:
+        with open(args.labels, "r", encoding="utf-8") as f:
+            labels = json.load(f)
+
+    cases = []  # (crop, resource, truth, easyocr seconds or None)
+    for name, image in load_shots(args.shots):
+        for resource, crop in crops_of(image):
+            elapsed = None
+            if name in labels:
+                truth = labels[name].get(resource, 0)
+            else:
+                start = time.perf_counter()
+                truth = easyocr_value(crop, resource)
+                elapsed = time.perf_counter() - start
+            cases.append((crop, resource, truth, elapsed))
+    if not cases:
+        raise SystemExit("No screenshots found")
+
+    if args.build:
+        glyphs, glyph_labels = build_bank((crop, truth) for crop, _, truth, _ in cases if truth > 0)
+        recognizer = DigitRecognizer(bank_path=args.bank)
+        recognizer.set_bank(glyphs, glyph_labels)
+        recognizer.save(args.bank)
+        print(f"Saved {len(glyph_labels)} glyphs ({len(set(glyph_labels))} distinct digits) to {args.bank}")
+        return
+
+    recognizer = DigitRecognizer(bank_path=args.bank)
+    if not recognizer.ready:
+        raise SystemExit(f"No digit bank at {args.bank}; run with --build first")
+
+    accepted = correct = 0
+    digit_times = []
+    for crop, resource, truth, _ in cases:
+        start = time.perf_counter()
+        value, confidence = recognizer.read(crop)
+        digit_times.append(time.perf_counter() - start)
+        if value is not None and confidence >= args.min_confidence:
+            accepted += 1
+            correct += clamp_value(value, resource) == truth
+
+    easy_times = [t for *_, t in cases if t is not None]
+    if not easy_times:
+        for crop, resource, _, _ in cases:
+            start = time.perf_counter()
+            easyocr_value(crop, resource)
+            easy_times.append(time.perf_counter() - start)
+
+    n = len(cases)
+    print(f"{n} crops, min confidence {args.min_confidence}")
+    print(f"  digit bank: accepted {accepted / n:.1%}, accuracy when accepted "
+          f"{correct / max(1, accepted):.1%}, mean {sum(digit_times) / n * 1000:.2f} ms")
+    print(f"  easyocr:    mean {sum(easy_times) / len(easy_times) * 1000:.1f} ms")
+    rejected = n - accepted
+    blended = (sum(digit_times) + rejected * sum(easy_times) / len(easy_times)) / n
+    print(f"  with fallback: mean {blended * 1000:.1f} ms per crop")
+
+
+if __name__ == "__main__":
+    main()
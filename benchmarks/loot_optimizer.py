@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Loot optimizer benchmark - fixed thresholds vs online tuning, on simulated time.
+
+Bases are drawn from the synthetic loot distribution of benchmarks.base_search;
+each base searched costs --base-seconds and each attack --attack-seconds (with
+some jitter). Reports loot/hour for the configured thresholds, for the
+LootOptimizer, and for the best fixed pair found in hindsight:
+
+    python -m benchmarks.loot_optimizer --hours 24
+    python -m benchmarks.loot_optimizer --hours 24 --drift 0.5   # loot halves mid-run
+"""
+import argparse
+import itertools
+import random
+
+import numpy as np
+
+import config
+from benchmarks.base_search import synthetic_bases
+from utils.loot_optimizer import LootOptimizer
+
+
+def base_stream(seed):
+    """Endless synthetic bases (the same sequence for the same seed)."""
+    for chunk in itertools.count():
+        for base in synthetic_bases(1000, seed=seed + chunk):
+            yield {r: int(v) for r, v in base.items()}
+
+
+def loot_value(base):
+    return sum(base[r] * w for r, w in config.LOOT_WEIGHTS.items())
+
+
+def simulate(args, gold, elixir, optimizer=None):
+    """Run --hours of searching and attacking; returns (loot/hour, attacks, bases)."""
+    jitter = random.Random(args.seed)
+    end = args.hours * 3600
+    clock = loot = 0.0
+    attacks = bases = searched = 0
+    for base in base_stream(args.seed):
+        if clock >= end:
+            break
+        if clock >= end / 2 and args.drift != 1.0:
+            base = {r: int(v * args.drift) for r, v in base.items()}
+        if optimizer:
+            thresholds = optimizer.thresholds()
+            gold, elixir = thresholds["gold"], thresholds["elixir"]
+            if optimizer.wants_sample():
+                optimizer.observe(base)
+        clock += args.base_seconds
+        bases += 1
+        searched += 1
+        if (base["gold"] >= gold or base["elixir"] >= elixir) and base["dark_elixir"] >= args.dark:
+            seconds = args.attack_seconds * jitter.uniform(0.8, 1.2)
+            if optimizer:
+                optimizer.record_search(searched, searched * args.base_seconds)
+                optimizer.record_attack(seconds)
+            clock += seconds
+            loot += loot_value(base)
+            attacks += 1
+            searched = 0
+    return loot / clock * 3600, attacks, bases
+
+
+def report(name, rate, attacks, bases, gold, elixir):
+    per_attack = bases / attacks if attacks else float("inf")
+    print(f"  {name:<22} Gold>={gold:>9,} Elixir>={elixir:>9,}  {rate:>12,.0f} loot/hour  "
+          f"{attacks:5d} attacks  {per_attack:5.1f} bases/attack")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed vs online-tuned loot thresholds on synthetic bases")
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--base-seconds", type=float, default=5.0, help="Time per base skipped")
+    parser.add_argument("--attack-seconds", type=float, default=150.0, help="Mean time per attack loop, search excluded")
+    parser.add_argument("--gold", type=int, default=config.GOLD_THRESHOLD)
+    parser.add_argument("--elixir", type=int, default=config.ELIXIR_THRESHOLD)
+    parser.add_argument("--dark", type=int, default=config.DARK_ELIXIR_THRESHOLD)
+    parser.add_argument("--drift", type=float, default=1.0, help="Loot multiplier for the second half of the run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.hours:g} h simulated, {args.base_seconds:g}s/base, {args.attack_seconds:g}s/attack"
+          + (f", loot x{args.drift:g} after {args.hours / 2:g} h" if args.drift != 1.0 else ""))
+    report("fixed", *simulate(args, args.gold, args.elixir), args.gold, args.elixir)
+
+    optimizer = LootOptimizer(gold=args.gold, elixir=args.elixir, dark=args.dark,
+                              base_seconds=args.base_seconds, attack_seconds=args.attack_seconds)
+    rate, attacks, bases = simulate(args, args.gold, args.elixir, optimizer)
+    final = optimizer.thresholds()
+    report(f"optimizer ({optimizer.updates} updates)", rate, attacks, bases, final["gold"], final["elixir"])
+
+    best = None
+    grid = {r: np.linspace(*bounds, 12).astype(int)
+            for r, bounds in (("gold", config.GOLD_THRESHOLD_BOUNDS), ("elixir", config.ELIXIR_THRESHOLD_BOUNDS))}
+    for gold, elixir in itertools.product(grid["gold"], grid["elixir"]):
+        result = simulate(args, int(gold), int(elixir))
+        if best is None or result[0] > best[0][0]:
+            best = (result, int(gold), int(elixir))
+    report("best fixed (hindsight)", *best[0], best[1], best[2])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Matching benchmark - accuracy and latency of each match engine on ui_main_base/.
+
+For every template folder a set of synthetic screens is built by pasting one of
+its templates (optionally rescaled) onto a background screenshot at a random
+position. Each engine is scored on hit rate (found within --tolerance px of the
+truth), detections on the untouched background (only buttons really on it should
+show up) and mean latency.
+
+    python -m benchmarks.matching
+    python -m benchmarks.matching --scales 0.9 1.0 1.1 --engines full pyramid
+"""
+import argparse
+import random
+import time
+
+import cv2
+
+import config
+from utils.matching import PyramidMatcher, match_full
+from utils.templates import TemplateLibrary
+
+
+def build_cases(library, background, per_folder, scales, rng):
+    """Yield (folder, screen, (cx, cy)) synthetic cases."""
+    bh, bw = background.shape[:2]
+    for folder in library.folders():
+        templates = library.get(folder)
+        for _ in range(per_folder):
+            _, template = rng.choice(templates)
+            scale = rng.choice(scales)
+            if scale != 1.0:
+                template = cv2.resize(template, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            th, tw = template.shape[:2]
+            if th >= bh or tw >= bw:
+                continue
+            x, y = rng.randrange(bw - tw), rng.randrange(bh - th)
+            screen = background.copy()
+            screen[y:y + th, x:x + tw] = template
+            yield folder, screen, (x + tw // 2, y + th // 2)
+
+
+def run_engine(match, library, cases, background, threshold, tolerance):
+    hits, times = 0, []
+    for folder, screen, (tx, ty) in cases:
+        start = time.perf_counter()
+        result = match(screen, library.get(folder), threshold)
+        times.append(time.perf_counter() - start)
+        if result:
+            _, (x, y), w, h = result
+            if abs(x + w // 2 - tx) <= tolerance and abs(y + h // 2 - ty) <= tolerance:
+                hits += 1
+
+    bg_hits = sum(1 for folder in library.folders()
+                  if match(background, library.get(folder), threshold))
+    return hits, bg_hits, sum(times) / max(1, len(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Template match engine benchmark")
+    parser.add_argument("--background", default=config.SCREENSHOT_NAME)
+    parser.add_argument("--per-folder", type=int, default=3)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0],
+                        help="Scales applied to pasted templates (simulated DPI change)")
+    parser.add_argument("--engines", nargs="+", default=["full", "pyramid"])
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--tolerance", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    background = cv2.imread(args.background)
+    if background is None:
+        raise SystemExit(f"Could not load: {args.background}")
+    library = TemplateLibrary(reload_interval=None)
+    cases = list(build_cases(library, background, args.per_folder, args.scales, random.Random(args.seed)))
+
+    engines = {
+        "full": match_full,
+        "pyramid": PyramidMatcher(factor=config.PYRAMID_FACTOR, scales=args.scales,
+                                  candidates=config.PYRAMID_CANDIDATES),
+    }
+    print(f"{len(cases)} cases over {len(library.folders())} folders, scales={args.scales}")
+    print(f"{'engine':<10}{'hit rate':>10}{'bg hits':>11}{'mean ms':>10}")
+    for name in args.engines:
+        hits, bg_hits, mean = run_engine(engines[name], library, cases, background,
+                                         args.threshold, args.tolerance)
+        print(f"{name:<10}{hits / max(1, len(cases)):>10.1%}{bg_hits:>11}{mean * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
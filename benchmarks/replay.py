@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Full-loop replay benchmark - runs CoCBot's flow against a recorded session.
+
+The session (see utils.replay.ReplayDeviceController) is replayed on a
+virtual clock: waits cost nothing, compute costs real time. Reports the
+timing metrics per stage (capture, per-folder detection, OCR, base decision,
+flow phases in virtual seconds) and loops/hour.
+
+    python -m benchmarks.replay recordings/session1 --loops 10
+    python -m benchmarks.replay recordings/session1 --capture-only   # just time frame decode + matching
+    python -m benchmarks.replay recordings/session1 --export replay.json
+    python -m benchmarks.replay recordings/session1 --synthetic-loot --loot-optimizer   # loot drawn per base
+"""
+import argparse
+import itertools
+from concurrent.futures import Future
+
+import bot
+import config
+import utils.device
+import utils.metrics
+from benchmarks.base_search import synthetic_bases
+from bot import CoCBot
+from utils.metrics import metrics
+from utils.replay import ReplayDeviceController, VirtualClock, virtual_time
+
+
+def synthetic_loot(seed=0):
+    """
+    Stand-ins for the bot's loot reads: every new base frame shows the next
+    synthetic base (benchmarks.base_search distribution) instead of its OCR'd loot.
+    Returns (get_resource_values, submit_resource_values).
+    """
+    bases = (base for chunk in itertools.count() for base in synthetic_bases(1000, seed=seed + chunk))
+    shown = {"frame": None, "values": None}
+
+    def get(screenshot, resources=None):
+        if shown["frame"] is not screenshot:
+            shown["frame"], shown["values"] = screenshot, {r: int(v) for r, v in next(bases).items()}
+        return {r: shown["values"][r] for r in (resources or shown["values"])}
+
+    def submit(screenshot, resources=None):
+        future = Future()
+        future.set_result(get(screenshot, resources))
+        return future
+
+    return get, submit
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session through the bot loop")
+    parser.add_argument("session", help="Folder with the recorded frames (and optional session.json)")
+    parser.add_argument("--loops", type=int, default=5)
+    parser.add_argument("--match-engine", default=config.MATCH_ENGINE)
+    parser.add_argument("--capture-only", action="store_true",
+                        help="Only capture and match every frame once, without the bot")
+    parser.add_argument("--synthetic-loot", action="store_true",
+                        help="Draw each base's loot from a synthetic distribution instead of reading it")
+    parser.add_argument("--loot-optimizer", action="store_true", help="Tune the loot thresholds while replaying")
+    parser.add_argument("--export", help="Also write the metrics to this file (.prom or .json)")
+    args = parser.parse_args()
+
+    # OCR in this process so it can be timed (no worker processes or shared server)
+    config.OCR_PROCESS_WORKERS = 0
+    config.OCR_SERVER = False
+    if args.synthetic_loot:
+        bot.get_resource_values, bot.submit_resource_values = synthetic_loot()
+
+    clock = VirtualClock()
+    device = ReplayDeviceController(args.session, clock=clock, match_engine=args.match_engine)
+    metrics.reset()
+
+    if args.capture_only:
+        folders = device.templates.folders()
+        for _ in device.frames:
+            device.detect_many(folders, device.take_screenshot())
+            device.tap(0, 0)
+        print(f"{len(device.frames)} frames, {len(folders)} template folders")
+        metrics.print_table()
+        return
+
+    coc_bot = CoCBot(device, loot_optimizer=args.loot_optimizer)
+
+    loop_times = []
+    # Metrics follow the virtual clock too, so flow phases include the waits a device would spend
+    with virtual_time(clock, bot, utils.device, utils.metrics):
+        for _ in range(args.loops):
+            device.rewind()
+            coc_bot.loop_count += 1
+            start = clock.time()
+            coc_bot._run_flow()
+            loop_times.append(clock.time() - start)
+
+    mean_loop = sum(loop_times) / len(loop_times)
+    print(f"{args.loops} loops over {len(device.frames)} frames, {len(device.taps)} taps, {device.captures} captures")
+    metrics.print_table()
+    print(f"  loop mean={mean_loop:.1f}s (virtual, {clock.slept:.1f}s of it waiting) "
+          f"-> {3600 / mean_loop:.1f} loops/hour")
+    stats = coc_bot.stats()
+    if stats["bases_per_min"]:
+        print(f"  search {stats['bases_per_min']:.1f} bases/min")
+    if coc_bot.loot_optimizer:
+        tuned = coc_bot.loot_optimizer.stats()
+        print(f"  thresholds Gold>={tuned['gold']:,} Elixir>={tuned['elixir']:,} after {tuned['samples']} samples "
+              f"({tuned['updates']} updates, ~{tuned['expected_per_hour']:,.0f} loot/hour)")
+    if args.export:
+        metrics.write(args.export)
+
+
+if __name__ == "__main__":
+    main()
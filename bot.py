@@ -2,14 +2,32 @@ import time
 import random
 import os
 import itertools
+from contextlib import contextmanager
 import config
 from deployment_config import DeploymentConfig
-from utils.text_detect_resource import get_resource_values
+from utils.base_evaluator import BaseEvaluator
+from utils.frame import frame_diff
+from utils.loot_optimizer import LootOptimizer
+from utils.metrics import metrics
+from utils.pipeline import Decision
+from utils.text_detect_resource import RESOURCE_BBOXES, get_resource_values, ocr_cache_stats, submit_resource_values
+
+# Bounding box of the whole loot panel, watched to tell one base from the next
+LOOT_REGION = (
+    min(b[0] for b in RESOURCE_BBOXES.values()), min(b[1] for b in RESOURCE_BBOXES.values()),
+    max(b[2] for b in RESOURCE_BBOXES.values()), max(b[3] for b in RESOURCE_BBOXES.values()),
+)
+LOOT_LABELS = {"gold": "Gold", "elixir": "Elixir", "dark_elixir": "Dark"}
 
 
 class CoCBot:
-    def __init__(self, device_controller, webhook_url=None, deployment_config=None):
+    def __init__(self, device_controller, webhook_url=None, deployment_config=None, pipeline=None,
+                 name=None, event_log=None, loot_optimizer=config.LOOT_OPTIMIZER):
         self.device = device_controller
+        self.name = name or getattr(device_controller, "device_id", None)  # Label for logs and stats in multi-device mode
+        self.event_log = event_log  # Optional EventLog (may be shared by several bots)
+        self._phase_times = {}
+        self.pipeline = pipeline  # Optional CapturePipeline the polling loops take decisions from
         self.webhook_url = webhook_url
         
         # Use provided config or create new one
@@ -22,7 +40,17 @@ class CoCBot:
         self.session_gold = 0
         self.session_elixir = 0
         self.session_dark = 0
+        self.session_bases = 0          # Bases evaluated while searching
+        self.session_search_time = 0.0  # Seconds spent searching
         self.last_resources = None
+        # Staged early-reject loot check (None = read all three values for every base; see STAGED_BASE_EVAL)
+        self.evaluator = BaseEvaluator() if config.STAGED_BASE_EVAL else None
+        # Online gold/elixir threshold tuning (None = the configured thresholds)
+        self.loot_optimizer = LootOptimizer(
+            gold=self.deploy_config.get("gold_threshold", config.GOLD_THRESHOLD),
+            elixir=self.deploy_config.get("elixir_threshold", config.ELIXIR_THRESHOLD),
+            dark=self.deploy_config.get("dark_threshold", config.DARK_ELIXIR_THRESHOLD),
+        ) if loot_optimizer else None
         self.deployed_heroes = {}
 
         self.flow = config.FLOW_CONFIG
@@ -36,9 +64,7 @@ class CoCBot:
         self._print_flow()
         self.stop_flag = False
         
-        with open(config.LOG_FILE, "a", encoding="utf-8") as f:
-            f.write("\n\n===== NEW BOT SESSION STARTED =====\n")
-            f.write(f"Start Time: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self._event("session_start", flow=self.flow)
 
         while not self.stop_flag:
             try:
@@ -48,6 +74,7 @@ class CoCBot:
                 self._log_summary()
             except Exception as e:
                 print(f"Error in loop: {e}")
+                self._event("error", loop=self.loop_count, message=str(e))
                 time.sleep(5)
         
         print("\n Bot stopped gracefully.")
@@ -62,42 +89,75 @@ class CoCBot:
             print(f"  {status} {task}")
         print("="*50 + "\n")
 
+    def _event(self, kind, **fields):
+        """Record a structured event in the event log, if there is one."""
+        if self.event_log:
+            self.event_log.log(kind, device=self.name, **fields)
+
+    @contextmanager
+    def _phase(self, name):
+        """Timing span for one step of the flow; the time also goes into the loop event."""
+        start = time.perf_counter()
+        with metrics.span("phase", device=self.name, phase=name):
+            yield
+        self._phase_times[name] = round(time.perf_counter() - start, 3)
+
     def _run_flow(self):
-        """Run each enabled task in order."""
-        if self.flow.get("collect_gold"):
-            self._collect_resource("gold_collect", "Gold")
-        if self.flow.get("collect_elixir"):
-            self._collect_resource("elixir_collect", "Elixir")
-        if self.flow.get("collect_dark_elixir"):
-            self._collect_resource("dark_elixir_collect", "Dark Elixir")
+        """Run each enabled task in order (timed as one loop)."""
+        self._phase_times = {}
+        start = time.perf_counter()
+        with metrics.span("loop", device=self.name):
+            attacked = self._run_tasks()
+        seconds = time.perf_counter() - start
+        self._event("loop", loop=self.loop_count, seconds=round(seconds, 3), phases=self._phase_times)
+        if attacked and self.loot_optimizer:
+            self.loot_optimizer.record_attack(seconds - self._phase_times.get("search", 0.0))
+
+    def _run_tasks(self):
+        """Returns True when a base was attacked."""
+        collectors = [
+            (folder, name) for task, folder, name in (
+                ("collect_gold", "gold_collect", "Gold"),
+                ("collect_elixir", "elixir_collect", "Elixir"),
+                ("collect_dark_elixir", "dark_elixir_collect", "Dark Elixir"),
+            ) if self.flow.get(task)
+        ]
+        if collectors:
+            with self._phase("collect"):
+                self._collect_resources(collectors)
 
         if not self.flow.get("find_match"):
-            return
+            return False
 
-        if not self._navigate_to_attack():
-            return
+        with self._phase("navigate"):
+            if not self._navigate_to_attack():
+                return False
 
         if self.flow.get("search_for_base"):
-            if not self._search_and_select_base():
-                return
+            with self._phase("search"):
+                if not self._search_and_select_base():
+                    return False
 
-        if self.flow.get("deploy_troops"):
-            self._deploy_troops()
-        if self.flow.get("deploy_heroes"):
-            self._deploy_heroes()
-        if self.flow.get("deploy_spells"):
-            self._deploy_spells()
-        if self.flow.get("trigger_abilities"):
-            self._trigger_abilities()
-
-        if self.flow.get("return_home"):
-            self._return_home()
+        for task, step in (
+            ("deploy_troops", self._deploy_troops),
+            ("deploy_heroes", self._deploy_heroes),
+            ("deploy_spells", self._deploy_spells),
+            ("trigger_abilities", self._trigger_abilities),
+            ("return_home", self._return_home),
+        ):
+            if self.flow.get(task):
+                with self._phase(task):
+                    step()
+        return True
 
-    def _collect_resource(self, folder: str, name: str):
-        """Collect a single resource type."""
-        print(f"Collecting {name}...")
-        self.device.take_screenshot()
-        self.device.detect_and_tap(f"ui_main_base/{folder}")
+    def _collect_resources(self, collectors):
+        """Collect every enabled resource type from a single screenshot."""
+        hits = self._observe([f"ui_main_base/{folder}" for folder, _ in collectors]).hits
+        for folder, name in collectors:
+            print(f"Collecting {name}...")
+            hit = hits[f"ui_main_base/{folder}"]
+            if hit:
+                self._tap_hit(hit)
 
     def _navigate_to_attack(self) -> bool:
         """Navigate to attack screen and click Find Match."""
@@ -113,78 +173,186 @@ class CoCBot:
             print("Timeout waiting for Find Match button")
             return False
         
-        time.sleep(2)
-        self.device.take_screenshot()
-        
-        if self.device.detect_and_tap("ui_main_base/attack"):
-            time.sleep(2)
+        # Some layouts ask to confirm with an "attack" button before searching
+        folders = ["ui_main_base/attack", "ui_main_base/next_button"]
+        state = self.device.wait_until(self.device.any_visible(folders), timeout=5,
+                                       region=self.device.region_of(folders))
+        if state and state[0] == "ui_main_base/attack":
+            self._tap_hit(state[1])
         
         return True
 
     def _wait_for_button(self, folder: str, timeout: int = 30) -> bool:
         """Wait for a button to appear."""
         start = time.time()
+        folders = [folder, "ui_main_base/okay_button"]
+        decision = None
         while time.time() - start < timeout:
-            self.device.take_screenshot()
-            if self.device.detect_and_tap(folder):
+            # Re-check as soon as the relevant area changes, at the latest after 2 s
+            decision = self._observe(folders, previous=decision, wait=2)
+            hits = decision.hits
+            if hits[folder]:
+                self._tap_hit(hits[folder])
                 return True
-            self.device.detect_and_tap("ui_main_base/okay_button")
-            time.sleep(2)
+            if hits["ui_main_base/okay_button"]:
+                self._tap_hit(hits["ui_main_base/okay_button"])
         return False
 
     def _search_and_select_base(self) -> bool:
         """Search for base meeting resource requirements."""
         print("Searching for base...")
-        search_start = time.time()
+        search_start = started = time.time()
         attempt = 1
+        base_frame = self._wait_for_next_base(None)
         
         while not self.stop_flag:
             if time.time() - search_start > self.deploy_config.get("base_search_timeout", config.BASE_SEARCH_TIMEOUT):
                 print("Timeout searching for base")
+                self._count_search(attempt - 1, started, found=False)
                 return False
 
-            resources = get_resource_values(config.SCREENSHOT_NAME)
-            if resources is None:
-                print(f"Base {attempt}: (failed to read resources)")
-                time.sleep(random.uniform(4.5, 5))
-                self.device.take_screenshot()
-                attempt += 1
-                continue
+            with metrics.span("base_decision", device=self.name):
+                attack, resources, next_hit = self._evaluate_base(base_frame)
 
             gold = resources.get("gold", 0)
             elixir = resources.get("elixir", 0)
             dark = resources.get("dark_elixir", 0)
 
-            if self.last_resources == resources or (gold == 0 and elixir == 0 and dark == 0):
+            if self.last_resources == resources or not any(resources.values()):
                 print(f"Base {attempt}: (skipping invalid read)")
             else:
-                print(f"Base {attempt}: Gold={gold:,} Elixir={elixir:,} Dark={dark:,}")
+                read = " ".join(f"{label}={resources[r]:,}" for r, label in LOOT_LABELS.items() if r in resources)
+                print(f"Base {attempt}: {read}")
 
             self.last_resources = resources.copy()
+            self._event("base", attempt=attempt, attack=attack, **resources)
 
-            if (gold >= self.deploy_config.get("gold_threshold", config.GOLD_THRESHOLD) or 
-                elixir >= self.deploy_config.get("elixir_threshold", config.ELIXIR_THRESHOLD)) and \
-               dark >= self.deploy_config.get("dark_threshold", config.DARK_ELIXIR_THRESHOLD):
+            if attack:
                 print("Target found!")
+                self._count_search(attempt, started, found=True)
                 self.session_gold += gold
                 self.session_elixir += elixir
                 self.session_dark += dark
-                
-                with open(config.LOG_FILE, "a", encoding="utf-8") as f:
-                    f.write(f"Attack {self.loop_count}: Gold={gold:,}, Elixir={elixir:,}, Dark={dark:,}\n")
-                
+                self._event("attack", loop=self.loop_count, gold=gold, elixir=elixir, dark=dark)
                 return True
 
             print("Skipping...")
-            if self.device.detect_and_tap("ui_main_base/next_button"):
+            if next_hit:
+                self._tap_hit(next_hit)
                 search_start = time.time()
             
-            time.sleep(random.uniform(4.5, 5))
-            self.device.take_screenshot()
+            base_frame = self._wait_for_next_base(base_frame)
             attempt += 1
         
         return False  # Stopped
 
+    def _evaluate_base(self, frame):
+        """
+        Read a base's loot and decide whether to attack it: (gold or elixir) and dark
+        above their thresholds. Returns (attack, values read, Next button hit).
+        OCR runs on the OCR pool while the Next button is found on the same frame,
+        so a skip can be tapped the moment the decision is made.
+        """
+        thresholds = {
+            "gold": self.deploy_config.get("gold_threshold", config.GOLD_THRESHOLD),
+            "elixir": self.deploy_config.get("elixir_threshold", config.ELIXIR_THRESHOLD),
+            "dark_elixir": self.deploy_config.get("dark_threshold", config.DARK_ELIXIR_THRESHOLD),
+        }
+        if self.loot_optimizer:
+            thresholds.update(self.loot_optimizer.thresholds())
+        # Bases sampled by the loot optimizer are read in full, whatever the decision
+        sample = bool(self.loot_optimizer and self.loot_optimizer.wants_sample())
+        staged = self.evaluator and not sample and self._stage_reads(thresholds)
+        pending = {}
+
+        def submit(resources=None):
+            try:
+                return submit_resource_values(frame, resources)
+            except Exception as e:
+                print(f"OCR pool unavailable ({e}), reading in process")
+                return None
+
+        def read(resource):
+            if resource not in pending:
+                pending[resource] = submit([resource])
+            if pending[resource] is not None:
+                try:
+                    return pending[resource].result()[resource]
+                except Exception as e:
+                    print(f"OCR worker failed ({e}), reading in process")
+            return get_resource_values(frame, resources=[resource])[resource]
+
+        if staged:
+            first = self.evaluator.first_read(thresholds)
+            if first:
+                pending[first] = submit([first])
+        else:
+            everything = submit()
+            pending = {resource: everything for resource in RESOURCE_BBOXES}
+        next_hit = self.device.detect_many(["ui_main_base/next_button"], frame)["ui_main_base/next_button"]
+
+        if staged:
+            attack, values = self.evaluator.evaluate(read, thresholds)
+        else:
+            values = {resource: read(resource) for resource in RESOURCE_BBOXES}
+            attack = (values["gold"] >= thresholds["gold"] or values["elixir"] >= thresholds["elixir"]) \
+                and values["dark_elixir"] >= thresholds["dark_elixir"]
+            if self.evaluator and any(values.values()):
+                # Keeps the pass rates current for the "auto" staging decision
+                self.evaluator.observe(values, thresholds)
+            if self.loot_optimizer and any(values.values()) and self.loot_optimizer.observe(values):
+                tuned = self.loot_optimizer.stats()
+                print(f"📊 Loot thresholds -> Gold={tuned['gold']:,} Elixir={tuned['elixir']:,} "
+                      f"(~{tuned['expected_per_hour']:,.0f} loot/hour)")
+                self._event("thresholds", gold=tuned["gold"], elixir=tuned["elixir"],
+                            expected_per_hour=round(tuned["expected_per_hour"]))
+        return attack, values, next_hit
+
+    def _count_search(self, bases, started, found):
+        """Add a search to the bases-per-minute statistics."""
+        elapsed = time.time() - started
+        self.session_bases += bases
+        self.session_search_time += elapsed
+        if self.loot_optimizer:
+            self.loot_optimizer.record_search(bases, elapsed)
+        self._event("search", bases=bases, seconds=round(elapsed, 3), found=found)
+        if elapsed > 0:
+            print(f"Evaluated {bases} bases in {elapsed:.1f}s ({bases / elapsed * 60:.1f}/min)")
+
+    def _stage_reads(self, thresholds):
+        """Whether to read loot one region at a time (STAGED_BASE_EVAL; "auto" when cheaper than one batch)."""
+        return config.STAGED_BASE_EVAL is True \
+            or self.evaluator.expected_reads(thresholds) < config.OCR_BATCH_COST
+
+    def _wait_for_next_base(self, previous_frame):
+        """
+        Wait until a base's loot panel is on screen: the loot area differs from
+        ``previous_frame`` (the base just skipped) and the Next button is visible.
+        Returns the frame to read the base from.
+        """
+        def loot_changed(frame):
+            return previous_frame is None or frame_diff(previous_frame, frame, LOOT_REGION) >= config.FRAME_CHANGE_THRESHOLD
+
+        timeout = self.deploy_config.get("next_base_timeout", config.NEXT_BASE_TIMEOUT)
+        deadline = time.time() + timeout
+        if self.pipeline:
+            decision = None
+            while True:
+                decision = self._observe(["ui_main_base/next_button"], previous=decision,
+                                         wait=max(deadline - time.time(), 0))
+                if loot_changed(decision.frame) and decision.hits["ui_main_base/next_button"]:
+                    return decision.frame
+                if time.time() >= deadline:
+                    print("Next base not detected in time, reading anyway")
+                    return decision.frame
+
+        def base_ready(frame):
+            return loot_changed(frame) and self.device.detect_button("ui_main_base/next_button", frame)
+
+        if not self.device.wait_until(base_ready, timeout=timeout):
+            print("Next base not detected in time, reading anyway")
+        return self.device.last_frame
+
     def _deploy_troops(self):
         """Deploy troops to battlefield with per-troop counts."""
         selected_troops = self.deploy_config.get("selected_troops", ["super_minion"])
@@ -221,11 +389,9 @@ class CoCBot:
                 time.sleep(0.3)  # Wait for troop selection UI
                 
                 # Deploy 'count' troops at locations
-                for i in range(count):
-                    tgt = locs[loc_index % len(locs)]
-                    self.device.tap(tgt[0], tgt[1], random_offset)
-                    time.sleep(random.uniform(0.1, 0.2))
-                    loc_index += 1
+                points = [locs[(loc_index + i) % len(locs)] for i in range(count)]
+                self._tap_points(points, random_offset, (0.1, 0.2))
+                loc_index += count
                 
                 time.sleep(0.3)  # Brief pause between troop types
             else:
@@ -262,14 +428,13 @@ class CoCBot:
             
             if self.device.detect_and_tap(f"ui_main_base/hero/{hero_folder}"):
                 print(f"Deploying {hero_folder}...")
-                for i in range(count):
-                    loc = hero_locs[loc_index % len(hero_locs)]
-                    self.device.tap(loc[0], loc[1], random_offset)
-                    coords = self.device.detect_button(f"ui_main_base/hero/{hero_folder}", threshold=0.8)
-                    if coords:
-                        self.deployed_heroes[hero_folder] = coords
-                    time.sleep(random.uniform(0.5, 1.0))
-                    loc_index += 1
+                points = [hero_locs[(loc_index + i) % len(hero_locs)] for i in range(count)]
+                self._tap_points(points, random_offset, (0.5, 1.0))
+                loc_index += count
+                coords = self.device.detect_button(f"ui_main_base/hero/{hero_folder}", threshold=0.8)
+                if coords:
+                    self.deployed_heroes[hero_folder] = coords
+                time.sleep(random.uniform(0.5, 1.0))
             else:
                 print(f"Hero button not found: {hero_folder}")
 
@@ -298,13 +463,54 @@ class CoCBot:
             
             if self.device.detect_and_tap(f"ui_main_base/spells/{spell_folder}"):
                 print(f"Deploying {spell_folder}...")
-                for i in range(count):
-                    loc = spell_locs[i % len(spell_locs)]
-                    self.device.tap(loc[0], loc[1], random_offset)
-                    time.sleep(0.3)
+                points = [spell_locs[i % len(spell_locs)] for i in range(count)]
+                self._tap_points(points, random_offset, 0.3)
             else:
                 print(f"Spell button not found: {spell_folder}")
 
+    def _observe(self, folders, previous=None, wait=2, poll_interval=None):
+        """
+        Return a Decision (frame + detect_many hits) for ``folders`` from a frame
+        taken after the last tap. With ``previous`` (the last Decision) it waits up
+        to ``wait`` s for the watched area to change, or, through the pipeline,
+        for a frame at least ``poll_interval`` s newer.
+        """
+        if self.pipeline:
+            after = self.device.last_input
+            if previous is not None:
+                after = max(after, previous.captured_at + (poll_interval or 0))
+            decision = self.pipeline.next_decision(folders, after=after, timeout=max(after - time.time(), 0) + wait,
+                                                   newer_than=previous)
+            if decision:
+                # Later detect_and_tap / OCR calls without a frame act on what the bot last saw
+                self.device.use_frame(decision.frame)
+                return decision
+            # Pipeline stalled (capture failing?): fall back to a direct capture
+            previous = None
+
+        started = time.time()
+        frame = None
+        if previous is not None:
+            kwargs = {"poll_interval": poll_interval} if poll_interval else {}
+            frame = self.device.wait_for_change(timeout=wait, region=self.device.region_of(folders), **kwargs)
+        if frame is None:
+            frame = self.device.last_frame if previous is not None else self.device.take_screenshot()
+        return Decision(frame, self.device.detect_many(folders, frame), started)
+
+    def _tap_hit(self, hit, offset=config.RANDOM_OFFSET):
+        """Tap the centre of a detect_many hit."""
+        self.device.tap(hit[0], hit[1], offset)
+
+    def _tap_points(self, points, offset, interval):
+        """Tap a wave of points, in one device round trip when the controller supports it."""
+        if hasattr(self.device, "tap_batch"):
+            self.device.tap_batch(points, offset, interval)
+            return
+        for i, (x, y) in enumerate(points):
+            if i:
+                time.sleep(random.uniform(*interval) if isinstance(interval, tuple) else interval)
+            self.device.tap(x, y, offset)
+
     def _trigger_abilities(self):
         """Trigger hero abilities."""
         self._trigger_hero_ability("grand_warden")
@@ -324,25 +530,44 @@ class CoCBot:
         wait_start = time.time()
         timeout = self.deploy_config.get("return_home_timeout", config.RETURN_HOME_TIMEOUT)
         
+        folders = ["ui_main_base/return_home", "ui_main_base/okay_button"]
+        decision = None
         while time.time() - wait_start < timeout:
             if self.stop_flag:
                 return
-            self.device.take_screenshot()
+            # The battlefield animates constantly, so waking early on change would only add captures:
+            # one capture per 3 s, as before
+            decision = self._observe(folders, previous=decision, wait=3, poll_interval=3.0)
+            hits = decision.hits
             
-            if self.device.detect_and_tap("ui_main_base/return_home"):
+            if hits["ui_main_base/return_home"]:
+                self._tap_hit(hits["ui_main_base/return_home"])
                 time.sleep(3)
-                self.device.detect_and_tap("ui_main_base/okay_button")
+                if hits["ui_main_base/okay_button"]:
+                    self._tap_hit(hits["ui_main_base/okay_button"])
                 return
-            
-            time.sleep(3)
         
         print("Force ending battle...")
-        self.device.take_screenshot()
-        self.device.detect_and_tap("ui_main_base/end_battle")
-        self.device.detect_and_tap("ui_main_base/surrender_button")
+        hits = self._observe(["ui_main_base/end_battle", "ui_main_base/surrender_button"]).hits
+        for hit in hits.values():
+            if hit:
+                self._tap_hit(hit)
         time.sleep(1)
-        self.device.take_screenshot()
-        self.device.detect_and_tap("ui_main_base/return_home")
+        hit = self._observe(["ui_main_base/return_home"]).hits["ui_main_base/return_home"]
+        if hit:
+            self._tap_hit(hit)
+
+    def stats(self):
+        """Session totals, for the multi-device summary."""
+        return {
+            "name": self.name,
+            "loops": self.loop_count,
+            "gold": self.session_gold,
+            "elixir": self.session_elixir,
+            "dark": self.session_dark,
+            "bases_per_min": self.session_bases / self.session_search_time * 60 if self.session_search_time else 0.0,
+            "runtime_min": (time.time() - self.start_time) / 60,
+        }
 
     def _log_summary(self):
         """Log session summary every 5 loops."""
@@ -353,6 +578,22 @@ class CoCBot:
         avg_gold = self.session_gold / self.loop_count
         avg_elixir = self.session_elixir / self.loop_count
         avg_dark = self.session_dark / self.loop_count
+        ocr_cache = ocr_cache_stats()
+        bases_per_min = self.stats()["bases_per_min"]
+        staged = self.evaluator.stats() if self.evaluator else None
+        # "auto" may never stage (batched reads cheaper): no reads/base to report
+        loot_reads = f" ({staged['reads_per_base']:.2f} loot reads/base)" if staged and staged["bases"] else ""
+        optimizer = ""
+        if self.loot_optimizer:
+            tuned = self.loot_optimizer.stats()
+            optimizer = (f"Thresholds: Gold={tuned['gold']:,} Elixir={tuned['elixir']:,} "
+                         f"(~{tuned['expected_per_hour']:,.0f} loot/hour, {tuned['samples']} bases sampled)\n")
+        device = str(self.name) if self.name is not None else None
+        phases = "".join(
+            f"  {row['labels']['phase']}: p50 {row['p50']:.1f}s  p95 {row['p95']:.1f}s\n"
+            for row in metrics.snapshot()
+            if row["name"] == "phase" and row["labels"].get("device") == device
+        )
         
         summary = (
             f"\n===== SESSION SUMMARY =====\n"
@@ -361,8 +602,13 @@ class CoCBot:
             f"Avg Elixir: {avg_elixir:,.0f}\n"
             f"Avg Dark: {avg_dark:,.0f}\n"
             f"Runtime: {elapsed_min:.1f} min\n"
+            f"Search: {bases_per_min:.1f} bases/min{loot_reads}\n"
+            f"{optimizer}"
+            f"OCR cache: {ocr_cache['hit_rate']:.0%} hits ({ocr_cache['hits']}/{ocr_cache['hits'] + ocr_cache['misses']})\n"
+            f"Phase timings:\n{phases}"
             f"===========================\n"
         )
         print(summary)
-        with open(config.LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(summary)
+        stats = self.stats()
+        del stats["name"]
+        self._event("summary", **stats)
@@ -24,11 +24,52 @@ FLOW_CONFIG = {
 # Discord Webhook URL for notifications (leave empty to disable)
 DISCORD_WEBHOOK_URL = ""
 
-# Screenshot filename (used for all template matching)
+# Screenshot filename (only written when SAVE_SCREENSHOTS is on; frames are matched in memory)
 SCREENSHOT_NAME = "screen.png"
 
-# Log file for session tracking
-LOG_FILE = "bot_session_log.txt"
+# How frames are pulled from the device:
+#   "png" - screencap -p (device PNG-encodes, host decodes)
+#   "raw" - raw RGBA framebuffer, no encode/decode (faster, more bytes over USB)
+#   "stream" - continuous screenrecord H.264 feed decoded in the background
+CAPTURE_MODE = "png"
+STREAM_FRAME_TIMEOUT = 0.25   # Max wait (s) for a fresher stream frame before reusing the latest
+
+# Keep one `adb shell` session open for taps instead of spawning adb per tap
+PERSISTENT_SHELL = True
+
+# Frame-change detection: frames are compared on a small grayscale thumbnail.
+# A mean absolute difference below FRAME_CHANGE_THRESHOLD (0-255) counts as "unchanged".
+SKIP_UNCHANGED_FRAMES = True   # Reuse a folder's last detection while its area is unchanged
+FRAME_CHANGE_THRESHOLD = 2.0
+CHANGE_POLL_INTERVAL = 0.5     # First gap (s) between captures while waiting for the screen to change,
+CHANGE_POLL_MAX_INTERVAL = 2.0  # doubling up to this while it stays the same
+
+# wait_until polling: starts at WAIT_MIN_INTERVAL, backs off to WAIT_MAX_INTERVAL on a static screen
+WAIT_MIN_INTERVAL = 0.1
+WAIT_MAX_INTERVAL = 0.8
+
+# Capture the next frame on a background thread while the previous one is analysed
+# (double buffering); the bot's polling loops then consume ready-made detections
+USE_PIPELINE = False
+PIPELINE_LINGER = 1.0   # Seconds the pipeline keeps capturing after the bot last asked for a decision
+
+# Write every captured frame to SCREENSHOT_NAME for debugging
+SAVE_SCREENSHOTS = False
+
+# Session event log (JSON lines: attacks, bases, loop timings, errors), buffered and
+# written in the background; rotated to .1 ... .N past EVENT_LOG_MAX_BYTES.
+# Summarise it with `python -m utils.event_log`.
+EVENT_LOG_FILE = "bot_events.jsonl"
+EVENT_LOG_MAX_BYTES = 10 * 1024 * 1024
+EVENT_LOG_BACKUPS = 5
+EVENT_LOG_FLUSH_INTERVAL = 2.0   # Seconds between background writes
+
+# Timing metrics (capture, per-folder detection, OCR, taps, flow phases) as p50/p95/p99.
+# METRICS_FILE is rewritten every METRICS_INTERVAL s: Prometheus text, or JSON if it ends in .json
+# ("" disables). METRICS_PORT > 0 also serves /metrics and /metrics.json on localhost.
+METRICS_FILE = "bot_metrics.prom"
+METRICS_PORT = 0
+METRICS_INTERVAL = 30
 
 # Random offset ranges to make clicks appear more human-like
 # Higher values = more variation in tap position
@@ -43,15 +84,94 @@ ELIXIR_THRESHOLD = 500_000      # Minimum elixir required
 DARK_ELIXIR_THRESHOLD = 0         # Minimum dark elixir required
 MAX_TROPHIES_ATTACK_THRESHOLD = 30  # Reserved for future trophy-based filtering
 
+# Read loot values one at a time and stop as soon as the base is rejected
+# (stage order adapts to observed rejection rates). False = always read all three
+# in one batched call. "auto" stages while the reads it expects per base (from the
+# pass rates seen so far) cost less than that batched call, OCR_BATCH_COST.
+STAGED_BASE_EVAL = "auto"
+# ~2.5 measured for EasyOCR on one CPU core, where staging needs ~2.2 reads/base without
+# a dark threshold and ~1.7 with one (benchmarks.base_search --simulate 2000: full ->
+# staged 599 -> 684 bases/min at dark=0). Set it near 1 when EasyOCR runs on a GPU.
+OCR_BATCH_COST = 2.5
+
+# Tune the gold/elixir thresholds online for the most loot per hour (within the bounds
+# below). Every LOOT_OPTIMIZER_SAMPLE_EVERY-th base is read in full to learn the loot
+# distribution; the time per base and per attack are measured as the bot runs.
+LOOT_OPTIMIZER = False
+GOLD_THRESHOLD_BOUNDS = (200_000, 1_500_000)
+ELIXIR_THRESHOLD_BOUNDS = (200_000, 1_500_000)
+LOOT_WEIGHTS = {"gold": 1.0, "elixir": 1.0, "dark_elixir": 100.0}  # Value of each resource in "loot"
+LOOT_OPTIMIZER_WINDOW = 500          # Recent sampled bases the distribution is built from
+LOOT_OPTIMIZER_MIN_SAMPLES = 50      # Keep the configured thresholds until this many samples
+LOOT_OPTIMIZER_SAMPLE_EVERY = 4
+LOOT_OPTIMIZER_BASE_SECONDS = 5.0    # Initial guesses, replaced by measurements
+LOOT_OPTIMIZER_ATTACK_SECONDS = 150.0
+
+# Read all loot regions in one EasyOCR recognition batch (no text-detection pass)
+OCR_BATCHED = True
+
+# Number of OCR results remembered by crop hash (0 disables the cache)
+OCR_CACHE_SIZE = 256
+
+# Fast digit recognizer for loot values (template bank of the game font).
+# Reads below DIGIT_MIN_CONFIDENCE fall back to EasyOCR. Build the bank with
+# `python -m benchmarks.digits --build <screenshots>`.
+DIGIT_OCR = True
+DIGIT_BANK_PATH = "digit_bank.npz"
+DIGIT_MIN_CONFIDENCE = 0.85
+
+# EasyOCR runs in this many worker processes (model loaded once per worker), so base
+# search keeps detecting and tapping while a base is read. 0 = a thread of the bot process.
+OCR_PROCESS_WORKERS = 1
+
+# Shared OCR server (`python -m utils.ocr_server`): one EasyOCR model serves every
+# bot process on the host. Bots use it when it is running and load a local model otherwise.
+OCR_SERVER = True
+# The socket and a random auth key (written by the server, mode 0600) live in a per-user
+# runtime directory (mode 0700): $XDG_RUNTIME_DIR/coc_bot, else <temp dir>/coc_bot-<uid>.
+OCR_SERVER_ADDRESS = ""          # "" = socket in the runtime directory (named pipe on Windows)
+OCR_SERVER_BATCH_WINDOW = 0.0    # Extra seconds to wait for more bots' requests (queued ones always batch)
+OCR_SERVER_TIMEOUT = 5.0         # Seconds a bot waits for an answer before reading locally
+OCR_SERVER_RETRY = 30            # Seconds between reconnect attempts while the server is unreachable
+
 # =============================================================================
 # TIMEOUTS (in seconds)
 # =============================================================================
 BASE_SEARCH_TIMEOUT = 120   # Maximum time to spend searching for a suitable base
 RETURN_HOME_TIMEOUT = 210   # Maximum time to wait for return home button after battle
+NEXT_BASE_TIMEOUT = 8       # Maximum time to wait for the next base's loot panel after skipping
 
 # =============================================================================
 # UI TEMPLATE FOLDERS
 # =============================================================================
+# Root folder scanned once at startup; every template below it is kept in memory
+TEMPLATE_ROOT = "ui_main_base"
+
+# How often (seconds) a template folder is re-checked for added/changed images.
+# Set to None to never reload after startup.
+TEMPLATE_RELOAD_INTERVAL = 5
+
+# Template matching engine:
+#   "full"    - every template over the search area at full resolution
+#   "pyramid" - match on a downscaled screen, refine peaks at full resolution
+MATCH_ENGINE = "full"
+PYRAMID_FACTOR = 0.25          # Downscale factor of the coarse level
+PYRAMID_SCALES = (1.0,)        # Template scales tried, e.g. (0.9, 1.0, 1.1) for other DPIs
+PYRAMID_CANDIDATES = 3         # Best coarse peaks refined per template
+
+# Threads used for template matching (templates / folders in parallel); 0 or 1 = serial
+MATCH_WORKERS = 0
+
+# Search windows (x1, y1, x2, y2) for template folders. Matching runs inside the
+# window first and falls back to the full frame on a miss. Folders not listed here
+# learn a window from where they were found (stored in ROI_CACHE_FILE).
+# Example: "ui_main_base/next_button": (1300, 450, 1600, 720),
+TEMPLATE_ROIS = {}
+ROI_CACHE_FILE = "template_rois.json"
+ROI_MIN_HITS = 3   # Hits needed before a learned window is used
+ROI_MARGIN = 40    # Padding (px) around the learned window
+ROI_WIDEN_HITS = 3 # Overlapping hits outside a learned window needed to widen it
+
 # Path to builder menu button template (for future use)
 BUILD_MENU_BUTTON_FOLDER = "ui_main_base/builder_menu_button"
 
@@ -25,6 +25,7 @@ class DeploymentConfig:
         "dark_threshold": config.DARK_ELIXIR_THRESHOLD,
         "base_search_timeout": config.BASE_SEARCH_TIMEOUT,
         "return_home_timeout": config.RETURN_HOME_TIMEOUT,
+        "next_base_timeout": config.NEXT_BASE_TIMEOUT,
         "troop_locations": config.TROOP_LOCATIONS,
         "spell_locations": config.SPELL_LOCATIONS,
         "hero_locations": config.HERO_LOCATIONS,
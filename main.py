@@ -2,31 +2,121 @@
 """
 Clash of Clans Bot - Main Entry Point
 """
+import time
+
+_START = time.time()
+
 import argparse
+import subprocess
 import config
-from utils.device import DeviceController
+from utils.device import DeviceController, list_devices
+from utils.event_log import EventLog
+from utils.matching import MATCH_ENGINES
+from utils.metrics import MetricsExporter
+from utils.multi_device import BotFleet
+from utils.pipeline import CapturePipeline
+from utils.roi import RoiTracker
 from bot import CoCBot
+from utils import text_detect_resource
 
 
 def main(args):
     """Run the bot."""
+    if not args.no_ocr_warmup:
+        # Load the OCR model while the device is being set up instead of at the first base
+        text_detect_resource.warm_up(background=True)
+
+    exporter = MetricsExporter(path=args.metrics_file, port=args.metrics_port)
+    exporter.start()
+    event_log = EventLog(args.event_log)
+    try:
+        run_bots(args, event_log)
+    finally:
+        event_log.close()
+        exporter.stop()
+
+
+def run_bots(args, event_log):
+    """Run one bot, or one per device in multi-device mode."""
+    if args.reset_rois:
+        RoiTracker().reset()
+        print(f"Cleared the learned template windows ({config.ROI_CACHE_FILE})")
+    device_ids = args.devices
+    if args.all_devices:
+        try:
+            device_ids = list_devices()
+        except (subprocess.CalledProcessError, OSError) as e:
+            raise SystemExit(f"Could not list devices with adb: {e}")
+        if not device_ids:
+            raise SystemExit("--all-devices: no connected devices found (check `adb devices`)")
+    if device_ids:
+        run_fleet(args, device_ids, event_log)
+        return
+
     print("Initializing Device Controller...")
-    device = DeviceController(device_id=args.device)
+    device = DeviceController(device_id=args.device, capture_mode=args.capture,
+                              match_engine=args.match_engine, match_workers=args.match_workers)
+
+    pipeline = None
+    if args.pipeline:
+        pipeline = CapturePipeline(device, linger=config.PIPELINE_LINGER)
+        pipeline.start()
 
+    print(f"Startup took {time.time() - _START:.2f}s")
     print("Starting CoC Bot...")
-    coc_bot = CoCBot(device_controller=device, webhook_url=args.webhook)
+    coc_bot = CoCBot(device_controller=device, webhook_url=args.webhook, pipeline=pipeline,
+                     event_log=event_log, loot_optimizer=args.loot_optimizer)
 
     try:
         coc_bot.run()
     except KeyboardInterrupt:
         print("\nBot stopped by user.")
+    finally:
+        if pipeline:
+            pipeline.stop()
+            print(f"Pipeline dropped {pipeline.frames_dropped} stale frames")
+        device.close()
+
+
+def run_fleet(args, device_ids, event_log):
+    """Drive several devices from this process."""
+    print(f"Initializing {len(device_ids)} devices: {', '.join(device_ids)}")
+    fleet = BotFleet(device_ids, webhook_url=args.webhook, capture_mode=args.capture,
+                     match_engine=args.match_engine, match_workers=args.match_workers,
+                     use_pipeline=args.pipeline, event_log=event_log, loot_optimizer=args.loot_optimizer)
+    print(f"Startup took {time.time() - _START:.2f}s")
+    fleet.run()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Clash of Clans Bot")
     parser.add_argument("--device", type=str, help="ADB Device ID")
+    parser.add_argument("--devices", nargs="+", metavar="ID",
+                       help="Run one bot per listed device in this process")
+    parser.add_argument("--all-devices", action="store_true",
+                       help="Run one bot per connected device in this process")
     parser.add_argument("--webhook", type=str, help="Discord Webhook URL",
                        default=config.DISCORD_WEBHOOK_URL)
+    parser.add_argument("--capture", choices=DeviceController.CAPTURE_MODES,
+                       default=config.CAPTURE_MODE, help="Screen capture mode")
+    parser.add_argument("--match-engine", choices=sorted(MATCH_ENGINES),
+                       default=config.MATCH_ENGINE, help="Template matching engine")
+    parser.add_argument("--match-workers", type=int, default=config.MATCH_WORKERS,
+                       help="Threads used for template matching (0/1 = serial)")
+    parser.add_argument("--pipeline", action=argparse.BooleanOptionalAction, default=config.USE_PIPELINE,
+                       help="Capture and analyse frames on background threads (double buffering)")
+    parser.add_argument("--loot-optimizer", action=argparse.BooleanOptionalAction, default=config.LOOT_OPTIMIZER,
+                       help="Tune the gold/elixir thresholds online for the most loot per hour")
+    parser.add_argument("--event-log", default=config.EVENT_LOG_FILE,
+                       help="JSON-lines event log (use a different file per bot process)")
+    parser.add_argument("--metrics-file", default=config.METRICS_FILE,
+                       help="Timing metrics file (.prom text or .json, empty to disable)")
+    parser.add_argument("--metrics-port", type=int, default=config.METRICS_PORT,
+                       help="Serve /metrics and /metrics.json on this localhost port (0 = off)")
+    parser.add_argument("--reset-rois", action="store_true",
+                       help="Forget the template search windows learned in earlier runs")
+    parser.add_argument("--no-ocr-warmup", action="store_true",
+                       help="Load the OCR model on first use instead of in the background at startup")
 
     args = parser.parse_args()
     main(args)
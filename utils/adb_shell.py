@@ -0,0 +1,131 @@
+import itertools
+import queue
+import subprocess
+import threading
+
+
+class AdbShellError(Exception):
+    """Raised when a command fails in the shell session.
+
+    ``delivered`` tells whether the command may already have run on the device,
+    in which case resending it (e.g. a tap) would repeat it.
+    """
+
+    def __init__(self, message, delivered=False):
+        super().__init__(message)
+        self.delivered = delivered
+
+
+class AdbShell:
+    """
+    Long-lived `adb shell` session.
+
+    Commands are written line-by-line to one pipe instead of spawning a new
+    adb process per command. Each command is followed by an echoed marker so
+    ``run`` can wait for it to finish; a dead or stuck session is restarted
+    and the command retried once if it never reached the device.
+    """
+
+    def __init__(self, device_id=None, command=None, popen=subprocess.Popen, timeout=5.0):
+        if command is None:
+            command = ["adb", "-s", device_id, "shell"] if device_id else ["adb", "shell"]
+        self.command = command
+        self.timeout = timeout
+        self._popen = popen
+        self._proc = None
+        self._lines = None
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+
+    @property
+    def alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        """Start (or restart) the shell process."""
+        self.close()
+        self._proc = self._popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._proc, self._lines), daemon=True).start()
+
+    def close(self):
+        """Terminate the shell process if running."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.stdin:
+                proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.terminate()
+            proc.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+
+    def run(self, cmd, wait=True, timeout=None):
+        """
+        Execute a shell command in the session.
+        With ``wait`` the call returns once the command has finished on the device;
+        ``timeout`` overrides the session default for long scripts.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            try:
+                return self._send(cmd, wait, timeout)
+            except AdbShellError as e:
+                # A command that was written may have run; drop the session but don't repeat it
+                if e.delivered:
+                    self.close()
+                    raise
+                # Session dropped (device reconnect, adb server restart...): retry once on a fresh one
+                self.start()
+                try:
+                    return self._send(cmd, wait, timeout)
+                except AdbShellError:
+                    self.close()
+                    raise
+
+    def _send(self, cmd, wait, timeout):
+        if not self.alive:
+            self.start()
+        marker = f"__adb_shell_done_{next(self._counter)}__"
+        line = f"{cmd}; echo {marker}\n" if wait else f"{cmd}\n"
+        try:
+            self._proc.stdin.write(line)
+            self._proc.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise AdbShellError(f"write failed: {e}") from e
+        if not wait:
+            return []
+
+        output = []
+        while True:
+            try:
+                out = self._lines.get(timeout=timeout)
+            except queue.Empty:
+                raise AdbShellError(f"timed out waiting for: {cmd}", delivered=True)
+            if out is None:
+                raise AdbShellError("shell exited", delivered=True)
+            out = out.rstrip("\r\n")
+            if out == marker:
+                return output
+            output.append(out)
+
+    @staticmethod
+    def _pump(proc, lines):
+        """Forward stdout lines to the queue; None marks end of stream."""
+        try:
+            for out in proc.stdout:
+                lines.put(out)
+        except (OSError, ValueError):
+            pass
+        lines.put(None)
@@ -0,0 +1,154 @@
+import itertools
+import threading
+import time
+
+
+class BaseEvaluator:
+    """
+    Staged early-reject check of a base's loot.
+
+    A base is attacked when (gold >= G or elixir >= E) and dark_elixir >= D.
+    Instead of reading all three regions, values are read one at a time and
+    evaluation stops as soon as the outcome is known: a low dark elixir read
+    rejects at once, a passing gold read makes the elixir read unnecessary.
+
+    Stage order adapts to what is observed. Each resource keeps a pass rate
+    (Laplace-smoothed) and a mean read time; the two conjuncts - the dark
+    check and the gold/elixir clause - run cheapest-per-rejection first
+    (cost / (1 - pass rate)), and inside the clause the resource most likely
+    to pass per unit of cost is read first.
+    """
+
+    RESOURCES = ("gold", "elixir", "dark_elixir")
+
+    def __init__(self, read_on_accept=True, cost_smoothing=0.2):
+        # Accepted bases are logged and counted in full, so their remaining values are read anyway
+        self.read_on_accept = read_on_accept
+        self.cost_smoothing = cost_smoothing
+        self._lock = threading.Lock()
+        self._seen = {r: 0 for r in self.RESOURCES}
+        self._passed = {r: 0 for r in self.RESOURCES}
+        self._cost = {r: None for r in self.RESOURCES}   # mean seconds per read
+        self.bases = 0
+        self.reads = 0
+
+    def pass_rate(self, resource):
+        with self._lock:
+            return (self._passed[resource] + 1) / (self._seen[resource] + 2)
+
+    def cost(self, resource):
+        with self._lock:
+            known = [c for c in self._cost.values() if c is not None]
+            cost = self._cost[resource]
+        if cost is None:
+            # Unmeasured reads are assumed to cost what the measured ones do on average
+            cost = sum(known) / len(known) if known else 1.0
+        return max(cost, 1e-6)
+
+    def clause_order(self, thresholds):
+        """Gold/elixir read order: a zero threshold (always passes) first, then most likely to pass per unit of cost."""
+        return sorted(("gold", "elixir"),
+                      key=lambda r: (thresholds[r] > 0, self.cost(r) / self.pass_rate(r)))
+
+    def stage_order(self, thresholds):
+        """The two conjuncts ("dark_elixir", "clause"), cheapest per rejection first."""
+        first, second = self.clause_order(thresholds)
+        p_first, p_second = self.pass_rate(first), self.pass_rate(second)
+        clause_cost = self.cost(first) + (1 - p_first) * self.cost(second)
+        clause_pass = 1 - (1 - p_first) * (1 - p_second)
+        ranks = {
+            "dark_elixir": self.cost("dark_elixir") / max(1 - self.pass_rate("dark_elixir"), 1e-6),
+            "clause": clause_cost / max(1 - clause_pass, 1e-6),
+        }
+        return sorted(ranks, key=ranks.get)
+
+    def first_read(self, thresholds):
+        """The resource evaluate() will read first (so callers can prefetch it), or None."""
+        for stage in self.stage_order(thresholds):
+            if stage == "dark_elixir":
+                if thresholds["dark_elixir"] > 0:
+                    return "dark_elixir"
+            elif thresholds["gold"] > 0 and thresholds["elixir"] > 0:
+                return self.clause_order(thresholds)[0]
+        return None
+
+    def evaluate(self, read, thresholds):
+        """
+        Decide on one base. ``read(resource)`` returns a resource's value and
+        ``thresholds`` maps every resource to its minimum.
+        Returns (attack, values) with the values that were read.
+        """
+        values = {}
+        recorded = 0
+
+        def value(resource):
+            nonlocal recorded
+            if resource not in values:
+                start = time.perf_counter()
+                values[resource] = read(resource)
+                recorded += 1
+                self._record(resource, values[resource] >= thresholds[resource],
+                             time.perf_counter() - start)
+            return values[resource]
+
+        attack = self._decide(thresholds, lambda r: value(r) >= thresholds[r])
+        if attack and self.read_on_accept:
+            # Not recorded: values read after the decision would skew the pass rates
+            for resource in self.RESOURCES:
+                if resource not in values:
+                    values[resource] = read(resource)
+        with self._lock:
+            self.bases += 1
+            self.reads += len(values) - recorded
+        return attack, values
+
+    def _decide(self, thresholds, passes):
+        """Run the stages; ``passes(resource)`` is only called for the regions that must be read."""
+        for stage in self.stage_order(thresholds):
+            if stage == "dark_elixir":
+                passed = thresholds["dark_elixir"] <= 0 or passes("dark_elixir")
+            else:
+                passed = any(thresholds[r] <= 0 or passes(r) for r in self.clause_order(thresholds))
+            if not passed:
+                return False
+        return True
+
+    def expected_reads(self, thresholds):
+        """Expected region reads per base for evaluate() at the current pass rates (resources taken as independent)."""
+        rates = {r: self.pass_rate(r) for r in self.RESOURCES}
+        expected = 0.0
+        for outcome in itertools.product((True, False), repeat=len(self.RESOURCES)):
+            passes = dict(zip(self.RESOURCES, outcome))
+            probability = 1.0
+            for resource, passed in passes.items():
+                probability *= rates[resource] if passed else 1 - rates[resource]
+            read = set()
+            attack = self._decide(thresholds, lambda r: read.add(r) or passes[r])
+            expected += probability * (len(self.RESOURCES) if attack and self.read_on_accept else len(read))
+        return expected
+
+    def observe(self, values, thresholds):
+        """Learn pass rates from a base whose values were all read in one batch (read times unknown)."""
+        with self._lock:
+            for resource in self.RESOURCES:
+                self._seen[resource] += 1
+                self._passed[resource] += values[resource] >= thresholds[resource]
+
+    def _record(self, resource, passed, elapsed):
+        with self._lock:
+            self.reads += 1
+            self._seen[resource] += 1
+            self._passed[resource] += passed
+            old = self._cost[resource]
+            self._cost[resource] = elapsed if old is None else old + self.cost_smoothing * (elapsed - old)
+
+    def stats(self):
+        """Reads per base and the current pass rates, for summaries."""
+        with self._lock:
+            bases = self.bases
+            reads = self.reads
+        return {
+            "bases": bases,
+            "reads_per_base": reads / bases if bases else 0.0,
+            "pass_rates": {r: self.pass_rate(r) for r in self.RESOURCES},
+        }
@@ -1,24 +1,68 @@
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 import cv2
-import glob
 import os
 import random
+import threading
+import time
 import config
+from utils.adb_shell import AdbShell, AdbShellError
+from utils.frame import Frame, frame_diff, thumb_diff
+from utils.matching import ParallelMatcher, make_matcher
+from utils.metrics import metrics
+from utils.roi import RoiTracker
+from utils.stream_capture import StreamCapture
+from utils.templates import TemplateLibrary
+
+def list_devices():
+    """IDs of the devices `adb devices` reports as ready."""
+    result = subprocess.run(["adb", "devices"], capture_output=True, text=True, check=True)
+    return [line.split('\t')[0] for line in result.stdout.strip().split('\n')[1:]
+            if line.strip() and '\tdevice' in line]
+
 
 class DeviceController:
-    def __init__(self, device_id=None, verbose=False):
+    CAPTURE_MODES = ("png", "raw", "stream")
+
+    def __init__(self, device_id=None, verbose=False, templates=None, capture_mode=config.CAPTURE_MODE,
+                 persistent_shell=config.PERSISTENT_SHELL, rois=None, match_engine=config.MATCH_ENGINE,
+                 match_workers=config.MATCH_WORKERS, stream_source=None):
+        if capture_mode not in self.CAPTURE_MODES:
+            raise ValueError(f"Unknown capture mode: {capture_mode}")
         self.device_id = device_id
         self.verbose = verbose
+        self.capture_mode = capture_mode
+        # Background H.264 stream for capture_mode="stream"; stream_source replays a recorded file
+        self.stream = None
+        self.stream_source = stream_source
+        # Templates are decoded once and shared; pass a library to reuse one across controllers
+        self.templates = templates or TemplateLibrary(verbose=verbose)
+        # Per-folder search windows (configured or learned from past hits)
+        self.rois = rois or RoiTracker()
+        # Matching engine used by detect_button (see utils.matching.MATCH_ENGINES)
+        self.match = make_matcher(match_engine)
+        # Optional thread pool: templates of a folder (or folders of a detect_many) match in parallel
+        self.executor = ThreadPoolExecutor(match_workers) if match_workers > 1 else None
+        self.match_parallel = ParallelMatcher(self.match, self.executor) if self.executor else self.match
+        if hasattr(self.match, "reload"):
+            # Drop the matcher's scaled copies of templates that changed on disk
+            self.templates.add_reload_listener(self.match.reload)
+        self.last_frame = None
+        # Guards last_frame and the lazy stream start (the pipeline captures from its own thread)
+        self._capture_lock = threading.Lock()
+        # time.time() when the last tap/tap batch finished; frames captured later reflect it
+        self.last_input = 0.0
+        # (folder, threshold) -> (thumbnail, hit, hit rect) of the last real match, for unchanged-frame reuse
+        self._detections = {}
         if not self.device_id:
             self.device_id = self.select_device()
+        # One long-lived `adb shell` reused by every tap instead of a process per tap
+        self.shell = AdbShell(self.device_id) if persistent_shell and self.device_id else None
 
     def select_device(self):
         """Auto-selects a device or asks the user."""
-        adb_command = ["adb", "devices"]
         try:
-            result = subprocess.run(adb_command, capture_output=True, text=True, check=True)
-            devices = [line.split('\t')[0] for line in result.stdout.strip().split('\n')[1:]
-                       if line.strip() and '\tdevice' in line]
+            devices = list_devices()
             if not devices:
                 print("❌ No devices connected.")
                 return None
@@ -39,78 +83,351 @@ class DeviceController:
 
     def tap(self, x, y, offset=0):
         """Performs a human-like tap with random offset."""
+        with metrics.span("tap", device=self.device_id):
+            self._tap(x, y, offset)
+
+    def _tap(self, x, y, offset):
         if not self.device_id:
             print("⚠️ No device connected.")
             return
 
         tx = x + random.randint(-offset, offset)
         ty = y + random.randint(-offset, offset)
+        if self.shell:
+            try:
+                self.shell.run(f"input tap {tx} {ty}")
+                self.last_input = time.time()
+                return
+            except AdbShellError as e:
+                if e.delivered:
+                    print(f"Tap may not have completed: {e}")
+                    return
+                print(f"Shell session failed, falling back to adb per tap: {e}")
+
         cmd = ["adb", "-s", self.device_id, "shell", "input", "tap", str(tx), str(ty)]
         try:
             subprocess.run(cmd, check=True)
             # print(f"Tapped at ({tx}, {ty})") 
         except subprocess.CalledProcessError as e:
             print(f"Failed to tap: {e}")
+        self.last_input = time.time()
+
+    def tap_batch(self, points, offset=0, interval=0.15):
+        """
+        Taps a list of (x, y) points in a single device round trip.
+        The taps are compiled into one shell script with `sleep`s in between;
+        `interval` is seconds between taps or a (min, max) range for random gaps.
+        """
+        with metrics.span("tap_batch", device=self.device_id):
+            self._tap_batch(points, offset, interval)
 
-    def take_screenshot(self, local_path=config.SCREENSHOT_NAME):
-        """Captures a screenshot from the device."""
+    def _tap_batch(self, points, offset, interval):
         if not self.device_id:
+            print("⚠️ No device connected.")
             return
+        if not points:
+            return
+
+        steps = []
+        total_gap = 0
+        for i, (x, y) in enumerate(points):
+            if i:
+                gap = random.uniform(*interval) if isinstance(interval, (tuple, list)) else interval
+                if gap > 0:
+                    steps.append(f"sleep {gap:.3f}")
+                    total_gap += gap
+            tx = x + random.randint(-offset, offset)
+            ty = y + random.randint(-offset, offset)
+            steps.append(f"input tap {tx} {ty}")
+        script = "; ".join(steps)
+
+        if self.shell:
+            try:
+                # `input tap` itself takes a few hundred ms on device; budget for it
+                self.shell.run(script, timeout=self.shell.timeout + total_gap + len(points))
+                self.last_input = time.time()
+                return
+            except AdbShellError as e:
+                if e.delivered:
+                    print(f"Tap batch may not have completed: {e}")
+                    return
+                print(f"Shell session failed, falling back to one-off adb: {e}")
+
+        cmd = ["adb", "-s", self.device_id, "shell", script]
         try:
-            cmd = ["adb", "-s", self.device_id, "exec-out", "screencap", "-p"]
-            with open(local_path, "wb") as f:
-                subprocess.run(cmd, check=True, stdout=f)
-            # print(f"Screenshot saved: {local_path}")
+            subprocess.run(cmd, check=True)
         except subprocess.CalledProcessError as e:
-            print(f"Failed to take screenshot: {e}")
+            print(f"Failed to tap batch: {e}")
+        self.last_input = time.time()
+
+    def take_screenshot(self, local_path=None):
+        """
+        Captures a screenshot from the device and decodes it once in memory.
+        The frame is kept as ``last_frame`` for the detectors and the OCR;
+        it is only written to disk when a path is given or SAVE_SCREENSHOTS is on.
+        """
+        frame = self.capture(newer_than=self.last_frame)
+        if frame is None:
+            return None
+        with self._capture_lock:
+            self.last_frame = frame
+
+        if local_path is None and config.SAVE_SCREENSHOTS:
+            local_path = config.SCREENSHOT_NAME
+        if local_path:
+            frame.save(local_path)
+        return frame
+
+    def use_frame(self, frame):
+        """Make a frame captured elsewhere (e.g. by the pipeline) ``last_frame``, unless a newer one is there."""
+        with self._capture_lock:
+            if self.last_frame is None or frame.timestamp >= self.last_frame.timestamp:
+                self.last_frame = frame
+
+    def capture(self, newer_than=None):
+        """
+        Capture and decode one frame without touching ``last_frame`` (for background
+        capture threads). In stream mode ``newer_than`` is the frame the caller already has.
+        """
+        with metrics.span("capture", device=self.device_id):
+            return self._capture(newer_than)
+
+    def _capture(self, newer_than):
+        if self.capture_mode == "stream":
+            frame = self._stream_frame(newer_than)
+        else:
+            if not self.device_id:
+                return None
+            raw = self.capture_mode == "raw"
+            try:
+                cmd = ["adb", "-s", self.device_id, "exec-out", "screencap"]
+                if not raw:
+                    cmd.append("-p")
+                result = subprocess.run(cmd, check=True, capture_output=True)
+            except subprocess.CalledProcessError as e:
+                print(f"Failed to take screenshot: {e}")
+                return None
+            frame = Frame.from_raw_bytes(result.stdout) if raw else Frame.from_png_bytes(result.stdout)
+
+        if frame is None:
+            print("Failed to decode screenshot")
+        return frame
+
+    def _stream_frame(self, newer_than):
+        """Newest frame of the background video stream, started on first use."""
+        with self._capture_lock:
+            if self.stream is None:
+                if not self.device_id and not self.stream_source:
+                    return None
+                self.stream = StreamCapture(self.device_id, source=self.stream_source)
+                self.stream.start()
+            stream = self.stream
+        # screenrecord only emits frames when the screen changes, so when nothing newer
+        # arrives quickly the latest frame is still what's on screen
+        frame = stream.wait_frame(newer_than=newer_than, timeout=config.STREAM_FRAME_TIMEOUT)
+        return frame or stream.latest()
 
-    def detect_button(self, button_folder, screenshot_path=config.SCREENSHOT_NAME, threshold=0.8):
+    def close(self):
+        """Release background resources (video stream, shell session, thread pool)."""
+        with self._capture_lock:
+            stream, self.stream = self.stream, None
+        if stream:
+            stream.stop()
+        if self.shell:
+            self.shell.close()
+        if self.executor:
+            self.executor.shutdown(wait=False)
+
+    def detect_button(self, button_folder, frame=None, threshold=0.8):
         """
         Detects a button/template on the screen.
+        `frame` may be a Frame, an image array or a screenshot path; defaults to the last capture.
         Returns (x, y) tuple if found, else None.
         """
-        if not os.path.exists(screenshot_path):
+        frame, screen = self._screen(frame)
+        if screen is None:
             return None
+        hit = self._detect(button_folder, frame, screen, threshold, {}, self.match_parallel)
+        return hit[:2] if hit else None
 
-        screen = cv2.imread(screenshot_path)
+    def detect_many(self, button_folders, frame=None, threshold=0.8):
+        """
+        Checks several template folders against one frame in a single pass.
+        The frame is resolved (and gray-converted) once and ROI crops are shared.
+        Returns {folder: (x, y, confidence) or None}.
+        """
+        frame, screen = self._screen(frame)
         if screen is None:
+            return {folder: None for folder in button_folders}
+        crops = {}
+        if self.executor and len(button_folders) > 1:
+            # One task per folder; each folder matches serially so pool workers never wait on each other
+            futures = {folder: self.executor.submit(self._detect, folder, frame, screen, threshold, crops, self.match)
+                       for folder in button_folders}
+            return {folder: future.result() for folder, future in futures.items()}
+        return {folder: self._detect(folder, frame, screen, threshold, crops, self.match_parallel)
+                for folder in button_folders}
+
+    def wait_for_change(self, timeout, region=None, poll_interval=config.CHANGE_POLL_INTERVAL,
+                        max_interval=config.CHANGE_POLL_MAX_INTERVAL):
+        """
+        Captures frames until the screen (or an (x1, y1, x2, y2) region) differs from
+        the last capture, so polling loops can react at once instead of sleeping blind.
+        The gap between captures doubles from ``poll_interval`` up to ``max_interval``
+        while nothing changes. Returns the changed frame, or None on timeout
+        (``last_frame`` is the newest capture either way).
+        """
+        reference = self.last_frame
+        deadline = time.time() + timeout
+        interval = poll_interval
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, max_interval)
+            frame = self.take_screenshot()
+            if frame is None:
+                continue
+            if reference is None or frame_diff(reference, frame, region) >= config.FRAME_CHANGE_THRESHOLD:
+                return frame
+
+    def wait_until(self, condition, timeout, poll_interval=config.WAIT_MIN_INTERVAL,
+                   max_interval=config.WAIT_MAX_INTERVAL, region=None):
+        """
+        Captures frames until ``condition(frame)`` returns something truthy, and returns it
+        (None on timeout). Polling starts at ``poll_interval`` and backs off towards
+        ``max_interval`` while the screen is static; any change resets it.
+
+        With a ``region`` (where the awaited state shows up, e.g. ``region_of`` the
+        folders) the condition is only re-evaluated once that region changes. Without
+        one it is evaluated on every capture: a small button appearing can stay under
+        the whole-frame change threshold.
+        """
+        deadline = time.time() + timeout
+        interval = poll_interval
+        checked = previous = None
+        while True:
+            frame = self.take_screenshot()
+            if frame is not None:
+                if region is None or checked is None or frame_diff(checked, frame, region) >= config.FRAME_CHANGE_THRESHOLD:
+                    result = condition(frame)
+                    if result:
+                        return result
+                    checked = frame
+                static = previous is not None and frame_diff(previous, frame) < config.FRAME_CHANGE_THRESHOLD
+                interval = min(interval * 2, max_interval) if static else poll_interval
+                previous = frame
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            time.sleep(min(interval, remaining))
+
+    def any_visible(self, button_folders, threshold=0.8):
+        """Condition for ``wait_until``: (folder, (x, y, confidence)) of the first folder found."""
+        def condition(frame):
+            hits = self.detect_many(button_folders, frame, threshold)
+            for folder in button_folders:
+                if hits[folder]:
+                    return folder, hits[folder]
             return None
+        return condition
 
-        template_paths = glob.glob(os.path.join(button_folder, '*'))
-        if not template_paths:
+    def region_of(self, button_folders, frame=None):
+        """
+        Union of the folders' search windows, for watching only where they can appear.
+        Returns None (whole screen) if any folder has no window yet.
+        """
+        frame = frame or self.last_frame
+        if frame is None:
+            return None
+        boxes = [self.rois.get(folder, frame.shape) for folder in button_folders]
+        if not boxes or any(box is None for box in boxes):
             return None
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes))
 
-        best_val = -1
-        best_loc = None
-        best_w, best_h = 0, 0
+    def _screen(self, frame):
+        """
+        Resolve a Frame / array / path (default: last capture).
+        Returns (Frame or None, array templates match against).
+        """
+        if frame is None:
+            frame = self.last_frame
+        if isinstance(frame, str):
+            frame = Frame.from_file(frame)
+        if frame is None:
+            return None, None
+        if isinstance(frame, Frame):
+            return frame, frame.gray if self.templates.grayscale else frame.image
+        if self.templates.grayscale and frame.ndim == 3:
+            return None, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return None, frame
 
-        for template_path in template_paths:
-            template = cv2.imread(template_path)
-            if template is None:
-                continue
-            
-            try:
-                res = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
-            except cv2.error:
-                continue
+    def _detect(self, button_folder, frame, screen, threshold, crops, match):
+        """Match one folder, timed per folder; returns (x, y, confidence) or None."""
+        with metrics.span("detect", device=self.device_id, folder=button_folder):
+            return self._detect_folder(button_folder, frame, screen, threshold, crops, match)
+
+    def _detect_folder(self, button_folder, frame, screen, threshold, crops, match):
+        """
+        Match one folder; returns (x, y, confidence) or None.
+        A hit is reused while the area of the hit is unchanged, and a miss while
+        the folder's search window is unchanged (a button appearing there changes
+        it a lot). A miss without a window is only reused for the very same frame:
+        a button appearing barely moves the whole-frame difference.
+        """
+        key = (os.path.normpath(button_folder), threshold)
+        previous = self._detections.get(key) if frame is not None and config.SKIP_UNCHANGED_FRAMES else None
+        roi = self.rois.get(button_folder, frame.shape) if previous else None
+        if previous:
+            prev_thumb, prev_hit, prev_rect = previous
+            thumb = frame.thumbnail
+            # A miss is cached with the window it was checked against
+            if prev_thumb is thumb or (prev_rect and (prev_hit or prev_rect == roi)
+                                       and thumb_diff(prev_thumb, thumb, prev_rect) < config.FRAME_CHANGE_THRESHOLD):
+                return prev_hit
+
+        hit, rect = self._match_folder(button_folder, screen, threshold, crops, match)
+        if frame is not None:
+            if hit is None:
+                rect = roi or self.rois.get(button_folder, frame.shape)
+            self._detections[key] = (frame.thumbnail, hit, rect)
+        return hit
+
+    def _match_folder(self, button_folder, screen, threshold, crops, match):
+        """Template-match one folder; returns ((x, y, confidence), hit rect) or (None, None)."""
+        templates = self.templates.get(button_folder)
+        if not templates:
+            return None, None
+
+        # Search the folder's window first; fall back to the whole frame on a miss
+        result = None
+        roi = self.rois.get(button_folder, screen.shape)
+        if roi:
+            x1, y1, x2, y2 = roi
+            crop = crops.setdefault(roi, screen[y1:y2, x1:x2])
+            result = match(crop, templates, threshold)
+            if result:
+                val, (mx, my), w, h = result
+                result = val, (mx + x1, my + y1), w, h
+        if result is None:
+            result = match(screen, templates, threshold)
+        if result is None:
+            return None, None
+
+        best_val, best_loc, best_w, best_h = result
+        rect = (best_loc[0], best_loc[1], best_loc[0] + best_w, best_loc[1] + best_h)
+        self.rois.record(button_folder, rect)
+        x = best_loc[0] + best_w // 2
+        y = best_loc[1] + best_h // 2
+        if self.verbose:
+            print(f"Found {os.path.basename(button_folder)} at ({x},{y}) conf={best_val*100:.1f}%")
+        return (x, y, best_val), rect
 
-            _, max_val, _, max_loc = cv2.minMaxLoc(res)
-            if max_val > best_val and max_val >= threshold:
-                best_val = max_val
-                best_loc = max_loc
-                best_w, best_h = template.shape[1], template.shape[0]
-
-        if best_loc:
-            x = best_loc[0] + best_w // 2
-            y = best_loc[1] + best_h // 2
-            if self.verbose:
-                print(f"Found {os.path.basename(button_folder)} at ({x},{y}) conf={best_val*100:.1f}%")
-            return x, y
-        return None
-
-    def detect_and_tap(self, button_folder, screenshot_path=config.SCREENSHOT_NAME, threshold=0.8, offset=config.RANDOM_OFFSET):
+    def detect_and_tap(self, button_folder, frame=None, threshold=0.8, offset=config.RANDOM_OFFSET):
         """Detects a button and taps it immediately."""
-        coords = self.detect_button(button_folder, screenshot_path, threshold)
+        coords = self.detect_button(button_folder, frame, threshold)
         if coords:
             self.tap(coords[0], coords[1], offset)
             return True
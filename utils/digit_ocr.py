@@ -0,0 +1,138 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+import config
+
+# Every glyph is normalised to this size before it is compared with the bank
+GLYPH_W, GLYPH_H = 12, 18
+
+
+def _binarize(image):
+    """White digits on a dark outline: keep the bright pixels."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def segment_glyphs(image, min_height_ratio=0.5):
+    """
+    Split a loot crop into glyph images, left to right.
+    Returns a (N, GLYPH_H, GLYPH_W) float32 array.
+    """
+    binary = _binarize(image)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    if count <= 1:
+        return np.empty((0, GLYPH_H, GLYPH_W), np.float32)
+
+    # Drop background, blobs cut by the crop edge (bars, icons) and anything much
+    # shorter than the tallest remaining blob (specks, separators)
+    boxes = stats[1:, :4]
+    height = binary.shape[0]
+    boxes = boxes[(boxes[:, 1] > 0) & (boxes[:, 1] + boxes[:, 3] < height)]
+    if len(boxes) == 0:
+        return np.empty((0, GLYPH_H, GLYPH_W), np.float32)
+    tallest = boxes[:, 3].max()
+    boxes = boxes[boxes[:, 3] >= tallest * min_height_ratio]
+    boxes = boxes[np.argsort(boxes[:, 0])]
+
+    glyphs = []
+    for x, y, w, h in boxes:
+        glyph = binary[y:y + h, x:x + w]
+        glyphs.append(cv2.resize(glyph, (GLYPH_W, GLYPH_H), interpolation=cv2.INTER_AREA))
+    return np.asarray(glyphs, np.float32)
+
+
+def _normalise(glyphs):
+    """Zero-mean, unit-norm rows so a dot product is a correlation score."""
+    flat = glyphs.reshape(len(glyphs), -1)
+    flat = flat - flat.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(flat, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return flat / norms
+
+
+class DigitRecognizer:
+    """
+    Reads loot values rendered in the game's fixed font.
+
+    Crops are segmented into glyphs and every glyph is correlated against a
+    small bank of labelled digit samples in one matrix product. The value's
+    confidence is the weakest glyph score, so callers can fall back to
+    EasyOCR when a read is doubtful.
+    """
+
+    def __init__(self, bank_path=config.DIGIT_BANK_PATH):
+        self.bank_path = bank_path
+        self.labels = np.empty(0, dtype="<U1")
+        self._bank = np.empty((0, GLYPH_W * GLYPH_H), np.float32)
+        if bank_path and os.path.exists(bank_path):
+            self.load(bank_path)
+
+    @property
+    def ready(self):
+        return len(self.labels) > 0
+
+    def load(self, path):
+        data = np.load(path)
+        self.set_bank(data["samples"], data["labels"])
+
+    def save(self, path=None):
+        path = path or self.bank_path
+        samples = self._bank.reshape(-1, GLYPH_H, GLYPH_W)
+        np.savez_compressed(path, samples=samples, labels=self.labels)
+
+    def set_bank(self, samples, labels):
+        self.labels = np.asarray(labels, dtype="<U1")
+        self._bank = _normalise(np.asarray(samples, np.float32)).astype(np.float32)
+
+    def classify(self, glyphs):
+        """Return (labels, scores) for an (N, H, W) glyph array."""
+        if not self.ready or len(glyphs) == 0:
+            return [], np.empty(0, np.float32)
+        scores = _normalise(glyphs) @ self._bank.T
+        best = scores.argmax(axis=1)
+        return list(self.labels[best]), scores[np.arange(len(best)), best]
+
+    def read(self, image):
+        """Return (value, confidence); value is None when nothing readable was found."""
+        # No bank: skip segmenting so the EasyOCR fallback costs nothing extra
+        if not self.ready or image is None or image.size == 0:
+            return None, 0.0
+        labels, scores = self.classify(segment_glyphs(image))
+        if not labels:
+            return None, 0.0
+        return int("".join(labels)), float(scores.min())
+
+
+def build_bank(samples):
+    """
+    Build bank arrays from labelled crops.
+    ``samples`` is an iterable of (crop, value); crops whose glyph count doesn't
+    match the digits of their value are skipped. Returns (glyphs, labels).
+    """
+    glyphs, labels = [], []
+    for crop, value in samples:
+        digits = str(int(value))
+        found = segment_glyphs(crop)
+        if len(found) != len(digits):
+            continue
+        glyphs.extend(found)
+        labels.extend(digits)
+    return np.asarray(glyphs, np.float32).reshape(-1, GLYPH_H, GLYPH_W), np.asarray(labels, dtype="<U1")
+
+
+_recognizer = None
+_recognizer_lock = threading.Lock()
+
+
+def get_recognizer():
+    """Return the shared recognizer, loading the bank on first call."""
+    global _recognizer
+    if _recognizer is None:
+        with _recognizer_lock:
+            if _recognizer is None:
+                _recognizer = DigitRecognizer()
+    return _recognizer
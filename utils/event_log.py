@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Structured session log - buffered JSON lines with size-based rotation.
+
+Every event is one JSON object per line ({"ts": ..., "event": ..., ...}).
+Events are buffered in memory and appended by a background thread, so the
+bot loop never waits on disk. Summarise a log (including rotated files):
+
+    python -m utils.event_log bot_events.jsonl
+    python -m utils.event_log bot_events.jsonl --device emulator-5554 --hours 24
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import config
+
+
+class EventLog:
+    """
+    Append-only JSON-lines event log.
+
+    ``log()`` only queues the event; a flusher thread writes the queue every
+    ``flush_interval`` seconds (or as soon as ``buffer_size`` events are
+    waiting) through one open file handle. When the file would grow past
+    ``max_bytes`` it is rotated to ``path.1`` ... ``path.<backups>``.
+    One instance can be shared by every bot of a process.
+    """
+
+    def __init__(self, path=config.EVENT_LOG_FILE, max_bytes=config.EVENT_LOG_MAX_BYTES,
+                 backups=config.EVENT_LOG_BACKUPS, flush_interval=config.EVENT_LOG_FLUSH_INTERVAL,
+                 buffer_size=256):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.dropped = 0
+        self._pending = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="event-log", daemon=True)
+        self._thread.start()
+
+    def log(self, event, **fields):
+        """Queue one event; ``fields`` must be JSON-serialisable."""
+        record = {"ts": round(time.time(), 3), "event": event}
+        record.update(fields)
+        with self._cond:
+            self._pending.append(record)
+            if len(self._pending) >= self.buffer_size:
+                self._cond.notify()
+
+    def flush(self):
+        """Write everything queued so far."""
+        with self._cond:
+            records, self._pending = self._pending, []
+        if not records:
+            return
+        lines = []
+        for record in records:
+            try:
+                lines.append(json.dumps(record, default=str) + "\n")
+            except ValueError:
+                self.dropped += 1
+        data = "".join(lines).encode("utf-8")
+        with self._write_lock:
+            try:
+                self._rotate_if_needed(len(data))
+                if self._file is None:
+                    self._file = open(self.path, "ab")
+                self._file.write(data)
+                self._file.flush()
+            except OSError as e:
+                self.dropped += len(records)
+                print(f"Warning: Failed to write event log: {e}")
+
+    def close(self):
+        """Stop the flusher and write what is left."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        self.flush()
+        with self._write_lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            with self._cond:
+                if len(self._pending) < self.buffer_size:
+                    self._cond.wait(self.flush_interval)
+            self.flush()
+
+    def _rotate_if_needed(self, incoming):
+        if not self.max_bytes:
+            return
+        try:
+            size = self._file.tell() if self._file else os.path.getsize(self.path)
+        except OSError:
+            return
+        if size == 0 or size + incoming <= self.max_bytes:
+            return
+        if self._file:
+            self._file.close()
+            self._file = None
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def read_events(path, backups=config.EVENT_LOG_BACKUPS):
+    """Yield the events of a log and its rotated files, oldest first."""
+    paths = [f"{path}.{i}" for i in range(backups, 0, -1)] + [path]
+    for p in paths:
+        if not os.path.exists(p):
+            continue
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue   # a line cut short by a crash
+
+
+def summarise(events, device=None, since=None):
+    """Per-device loot/hour and search stats from an event stream."""
+    devices = {}
+    for e in events:
+        if (device and e.get("device") != device) or (since and e["ts"] < since):
+            continue
+        d = devices.setdefault(e.get("device") or "-", {
+            "first": e["ts"], "last": e["ts"], "attacks": 0, "gold": 0, "elixir": 0, "dark": 0,
+            "bases": 0, "search_s": 0.0, "loops": 0, "loop_s": 0.0, "errors": 0,
+        })
+        d["last"] = e["ts"]
+        kind = e["event"]
+        if kind == "attack":
+            d["attacks"] += 1
+            d["gold"] += e.get("gold", 0)
+            d["elixir"] += e.get("elixir", 0)
+            d["dark"] += e.get("dark", 0)
+        elif kind == "search":
+            d["bases"] += e.get("bases", 0)
+            d["search_s"] += e.get("seconds", 0.0)
+        elif kind == "loop":
+            d["loops"] += 1
+            d["loop_s"] += e.get("seconds", 0.0)
+        elif kind == "error":
+            d["errors"] += 1
+    for d in devices.values():
+        # Wall time between the first and last event, at least the time spent in loops
+        hours = max(d["last"] - d["first"], d["loop_s"], 1) / 3600
+        d["hours"] = hours
+        d["gold_per_hour"] = d["gold"] / hours
+        d["elixir_per_hour"] = d["elixir"] / hours
+        d["dark_per_hour"] = d["dark"] / hours
+        d["bases_per_min"] = d["bases"] / d["search_s"] * 60 if d["search_s"] else 0.0
+        d["mean_loop_s"] = d["loop_s"] / d["loops"] if d["loops"] else 0.0
+    return devices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loot/hour and search stats from a bot event log")
+    parser.add_argument("path", nargs="?", default=config.EVENT_LOG_FILE)
+    parser.add_argument("--device", help="Only this device")
+    parser.add_argument("--hours", type=float, help="Only the last N hours")
+    parser.add_argument("--json", action="store_true", help="Print the stats as JSON")
+    args = parser.parse_args()
+
+    since = time.time() - args.hours * 3600 if args.hours else None
+    stats = summarise(read_events(args.path), args.device, since)
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+    if not stats:
+        print("No events found")
+        return
+    for name, d in sorted(stats.items()):
+        print(f"{name}: {d['hours']:.1f} h, {d['loops']} loops (mean {d['mean_loop_s']:.0f}s), "
+              f"{d['attacks']} attacks, {d['errors']} errors")
+        print(f"  loot/hour: Gold={d['gold_per_hour']:,.0f} Elixir={d['elixir_per_hour']:,.0f} "
+              f"Dark={d['dark_per_hour']:,.0f}")
+        print(f"  search: {d['bases']} bases, {d['bases_per_min']:.1f} bases/min")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import struct
+import time
+
+import cv2
+import numpy as np
+
+# Pixel formats reported in the raw `screencap` header (android PixelFormat)
+RAW_FORMAT_RGBA_8888 = 1
+RAW_FORMAT_RGBX_8888 = 2
+RAW_FORMAT_BGRA_8888 = 5
+
+# Frames are compared on a grayscale thumbnail this fraction of the full size
+THUMB_SCALE = 0.1
+
+
+class Frame:
+    """A single decoded screen capture, shared by every detector in a tick."""
+
+    def __init__(self, image=None, timestamp=None, rgba=None, bgra=False):
+        self._image = image
+        self._raw = rgba
+        self._raw_is_bgra = bgra
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self._gray = None
+        self._thumb = None
+
+    @classmethod
+    def from_png_bytes(cls, data, timestamp=None):
+        """Decode PNG bytes (as returned by ``screencap -p``) into a frame."""
+        if not data:
+            return None
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        return cls(image, timestamp)
+
+    @classmethod
+    def from_raw_bytes(cls, data, timestamp=None):
+        """
+        Wrap raw `screencap` output (no -p) without copying the pixels.
+        The header is width, height, format and, on Android 8+, a colorspace word;
+        its size is inferred from the payload length.
+        """
+        if not data or len(data) < 12:
+            return None
+        width, height, fmt = struct.unpack_from("<III", data, 0)
+        if fmt not in (RAW_FORMAT_RGBA_8888, RAW_FORMAT_RGBX_8888, RAW_FORMAT_BGRA_8888):
+            return None
+        size = width * height * 4
+        header = len(data) - size
+        if header not in (12, 16):
+            return None
+        pixels = np.frombuffer(data, dtype=np.uint8, count=size, offset=header)
+        return cls(rgba=pixels.reshape(height, width, 4), timestamp=timestamp,
+                   bgra=fmt == RAW_FORMAT_BGRA_8888)
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a frame from an image on disk (debugging / offline use)."""
+        image = cv2.imread(path)
+        if image is None:
+            return None
+        return cls(image)
+
+    @property
+    def image(self):
+        """BGR pixels; raw captures are converted on first access."""
+        if self._image is None and self._raw is not None:
+            code = cv2.COLOR_BGRA2BGR if self._raw_is_bgra else cv2.COLOR_RGBA2BGR
+            self._image = cv2.cvtColor(self._raw, code)
+        return self._image
+
+    @property
+    def gray(self):
+        """Grayscale copy of the frame, converted once and cached."""
+        if self._gray is None:
+            if self._image is None and self._raw is not None:
+                code = cv2.COLOR_BGRA2GRAY if self._raw_is_bgra else cv2.COLOR_RGBA2GRAY
+                self._gray = cv2.cvtColor(self._raw, code)
+            else:
+                self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def thumbnail(self):
+        """Small grayscale copy used for cheap change detection."""
+        if self._thumb is None:
+            self._thumb = cv2.resize(self.gray, None, fx=THUMB_SCALE, fy=THUMB_SCALE,
+                                     interpolation=cv2.INTER_AREA)
+        return self._thumb
+
+    @property
+    def shape(self):
+        if self._image is None and self._raw is not None:
+            return self._raw.shape[:2] + (3,)
+        return self.image.shape
+
+    def crop(self, bbox):
+        """Return the (x1, y1, x2, y2) region of the frame."""
+        x1, y1, x2, y2 = bbox
+        return self.image[y1:y2, x1:x2]
+
+    def save(self, path):
+        """Write the frame to disk as an image."""
+        return cv2.imwrite(path, self.image)
+
+
+def frame_diff(a, b, region=None):
+    """
+    Mean absolute difference (0-255) between two frames' thumbnails,
+    optionally inside an (x1, y1, x2, y2) region given in full-frame pixels.
+    """
+    return thumb_diff(a.thumbnail, b.thumbnail, region)
+
+
+def thumb_diff(ta, tb, region=None):
+    """``frame_diff`` on thumbnails already taken (lets callers keep thumbnails, not frames)."""
+    if ta.shape != tb.shape:
+        return float("inf")
+    if region:
+        x1, y1, x2, y2 = region
+        x1, y1 = int(x1 * THUMB_SCALE), int(y1 * THUMB_SCALE)
+        x2 = max(x1 + 1, int(np.ceil(x2 * THUMB_SCALE)))
+        y2 = max(y1 + 1, int(np.ceil(y2 * THUMB_SCALE)))
+        ta, tb = ta[y1:y2, x1:x2], tb[y1:y2, x1:x2]
+    return float(cv2.absdiff(ta, tb).mean())
+
+
+def as_image(source):
+    """Resolve a Frame, ndarray or image path into a BGR ndarray (or None)."""
+    if source is None:
+        return None
+    if isinstance(source, Frame):
+        return source.image
+    if isinstance(source, np.ndarray):
+        return source
+    return cv2.imread(source)
@@ -0,0 +1,142 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+import config
+
+
+class LootOptimizer:
+    """
+    Online tuning of the gold/elixir search thresholds for loot per hour.
+
+    A higher threshold finds richer bases but skips more of them, and every
+    skip costs a Next. With p the share of bases accepted, L their mean loot,
+    t_base the time per base searched and t_attack the rest of an attack loop
+    (navigate, deploy, battle, return home):
+
+        loot/hour = 3600 * p * L / (t_base + p * t_attack)
+
+    p and L come from the observed loot distribution. Every ``sample_every``-th
+    base is read in full and kept in a window of recent samples (the staged
+    evaluator's partial reads would bias it toward accepted bases). t_base and
+    t_attack are running means of measured times. Every ``update_every``
+    samples, the pair of candidate thresholds (sample quantiles inside the
+    bounds) with the highest estimate replaces the current pair when it is at
+    least ``min_gain`` better. The dark elixir threshold is left as configured.
+    """
+
+    def __init__(self, gold=config.GOLD_THRESHOLD, elixir=config.ELIXIR_THRESHOLD,
+                 dark=config.DARK_ELIXIR_THRESHOLD, gold_bounds=config.GOLD_THRESHOLD_BOUNDS,
+                 elixir_bounds=config.ELIXIR_THRESHOLD_BOUNDS, weights=config.LOOT_WEIGHTS,
+                 window=config.LOOT_OPTIMIZER_WINDOW, min_samples=config.LOOT_OPTIMIZER_MIN_SAMPLES,
+                 sample_every=config.LOOT_OPTIMIZER_SAMPLE_EVERY, update_every=20, min_gain=0.02,
+                 min_accepts=5, base_seconds=config.LOOT_OPTIMIZER_BASE_SECONDS,
+                 attack_seconds=config.LOOT_OPTIMIZER_ATTACK_SECONDS, smoothing=0.1, grid=24):
+        self.bounds = {"gold": gold_bounds, "elixir": elixir_bounds}
+        self.dark = dark
+        self.weights = weights
+        self.min_samples = min_samples
+        self.sample_every = max(1, sample_every)
+        self.update_every = update_every
+        self.min_gain = min_gain
+        self.min_accepts = min_accepts
+        self.smoothing = smoothing
+        self.grid = grid
+        self.base_seconds = base_seconds      # running mean per base searched
+        self.attack_seconds = attack_seconds  # running mean per attack loop, search excluded
+        self._lock = threading.Lock()
+        self._thresholds = {"gold": self._clamp("gold", gold), "elixir": self._clamp("elixir", elixir)}
+        self._samples = deque(maxlen=window)  # (gold, elixir, dark_elixir)
+        self._bases = 0
+        self._new_samples = 0
+        self.updates = 0
+
+    def _clamp(self, resource, value):
+        low, high = self.bounds[resource]
+        return int(min(max(value, low), high))
+
+    def thresholds(self):
+        """Current {"gold": ..., "elixir": ...} thresholds."""
+        with self._lock:
+            return dict(self._thresholds)
+
+    def wants_sample(self):
+        """Call once per base: True when this base should be read in full and observed."""
+        with self._lock:
+            self._bases += 1
+            return (self._bases - 1) % self.sample_every == 0
+
+    def observe(self, values):
+        """Add a fully read base; returns True when the thresholds changed."""
+        with self._lock:
+            self._samples.append((values["gold"], values["elixir"], values["dark_elixir"]))
+            self._new_samples += 1
+            if len(self._samples) < self.min_samples or self._new_samples < self.update_every:
+                return False
+            self._new_samples = 0
+            return self._update()
+
+    def record_search(self, bases, seconds):
+        if bases:
+            with self._lock:
+                self.base_seconds += self.smoothing * (seconds / bases - self.base_seconds)
+
+    def record_attack(self, seconds):
+        with self._lock:
+            self.attack_seconds += self.smoothing * (seconds - self.attack_seconds)
+
+    def expected_rate(self, gold=None, elixir=None):
+        """Estimated loot/hour for a threshold pair (default: the current one) over the samples."""
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            gold = self._thresholds["gold"] if gold is None else gold
+            elixir = self._thresholds["elixir"] if elixir is None else elixir
+            return float(self._rates(np.array(self._samples, dtype=float), [gold], [elixir])[0][0, 0])
+
+    def _rates(self, samples, golds, elixirs):
+        """Loot/hour and accepted count for every (gold, elixir) candidate pair."""
+        g, e, d = samples[:, 0], samples[:, 1], samples[:, 2]
+        value = g * self.weights["gold"] + e * self.weights["elixir"] + d * self.weights["dark_elixir"]
+        accept = (g >= np.asarray(golds, dtype=float)[:, None, None]) \
+            | (e >= np.asarray(elixirs, dtype=float)[None, :, None])
+        accept &= d >= self.dark
+        accepted = accept.sum(axis=-1)
+        loot = (accept * value).sum(axis=-1)
+        seconds = len(samples) * self.base_seconds + accepted * self.attack_seconds
+        return 3600 * loot / seconds, accepted
+
+    def _candidates(self, values, resource):
+        low, high = self.bounds[resource]
+        quantiles = np.quantile(values, np.linspace(0, 1, self.grid))
+        return np.unique(np.clip(np.concatenate([quantiles, [low, high, self._thresholds[resource]]]), low, high))
+
+    def _update(self):
+        samples = np.array(self._samples, dtype=float)
+        golds = self._candidates(samples[:, 0], "gold")
+        elixirs = self._candidates(samples[:, 1], "elixir")
+        rates, accepted = self._rates(samples, golds, elixirs)
+        # Too few accepted samples is noise, not a rich band of bases
+        rates[accepted < self.min_accepts] = 0.0
+        i, j = np.unravel_index(np.argmax(rates), rates.shape)
+        current = self._rates(samples, [self._thresholds["gold"]], [self._thresholds["elixir"]])[0][0, 0]
+        if rates[i, j] <= current * (1 + self.min_gain):
+            return False
+        self._thresholds = {"gold": int(golds[i]), "elixir": int(elixirs[j])}
+        self.updates += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            thresholds = dict(self._thresholds)
+            samples = len(self._samples)
+            base_seconds, attack_seconds = self.base_seconds, self.attack_seconds
+        return {
+            **thresholds,
+            "samples": samples,
+            "updates": self.updates,
+            "base_seconds": base_seconds,
+            "attack_seconds": attack_seconds,
+            "expected_per_hour": self.expected_rate(),
+        }
@@ -0,0 +1,190 @@
+import os
+import threading
+
+import cv2
+
+import config
+
+
+def match_full(screen, templates, threshold):
+    """
+    Exhaustive matcher: every template against the whole screen at full resolution.
+    Returns (confidence, top-left, w, h) of the best template above threshold, or None.
+    """
+    best_val = -1
+    best_loc = None
+    best_w, best_h = 0, 0
+
+    for _, template in templates:
+        try:
+            res = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+        except cv2.error:
+            continue
+
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        if max_val > best_val and max_val >= threshold:
+            best_val = max_val
+            best_loc = max_loc
+            best_w, best_h = template.shape[1], template.shape[0]
+
+    if best_loc is None:
+        return None
+    return best_val, best_loc, best_w, best_h
+
+
+class PyramidMatcher:
+    """
+    Coarse-to-fine matcher.
+
+    Each template (at every scale in ``scales``, to tolerate other device DPIs)
+    is first matched against a ``factor``-downscaled screen; the ``candidates``
+    best coarse peaks above ``threshold - coarse_slack`` are each refined at full
+    resolution inside a small window around the peak (downscaling can rank a
+    look-alike above the real button). Same return value as ``match_full``.
+
+    Scaled templates are cached per template path; call ``reload`` when the
+    templates change (DeviceController does so on TemplateLibrary reloads).
+    """
+
+    def __init__(self, factor=0.25, scales=(1.0,), coarse_slack=0.15, min_coarse_size=8, candidates=3):
+        self.factor = factor
+        self.scales = tuple(scales)
+        self.coarse_slack = coarse_slack
+        self.min_coarse_size = min_coarse_size
+        self.candidates = candidates
+        self._lock = threading.Lock()
+        self._resized = {}  # (path, scale) -> (template, full-res scaled, coarse scaled or None)
+
+    def __call__(self, screen, templates, threshold):
+        coarse_screen = None
+        # A thin crop (e.g. a window at the frame edge) can round to 0 px when downscaled
+        if min(screen.shape[:2]) * self.factor >= 1:
+            coarse_screen = cv2.resize(screen, None, fx=self.factor, fy=self.factor,
+                                       interpolation=cv2.INTER_AREA)
+        best_val = -1
+        best_loc = None
+        best_w, best_h = 0, 0
+
+        for path, template in templates:
+            for scale in self.scales:
+                full, coarse = self._scaled(path, template, scale)
+                h, w = full.shape[:2]
+                if h > screen.shape[0] or w > screen.shape[1]:
+                    continue
+                if coarse is None or coarse_screen is None or coarse.shape[0] > coarse_screen.shape[0] \
+                        or coarse.shape[1] > coarse_screen.shape[1]:
+                    # Template or screen too small to survive downscaling: match it directly
+                    result = match_full(screen, [(None, full)], threshold)
+                else:
+                    result = self._coarse_to_fine(screen, coarse_screen, full, coarse, threshold)
+                if result and result[0] > best_val:
+                    best_val, best_loc = result[0], result[1]
+                    best_w, best_h = w, h
+
+        if best_loc is None:
+            return None
+        return best_val, best_loc, best_w, best_h
+
+    def _coarse_to_fine(self, screen, coarse_screen, full, coarse, threshold):
+        try:
+            res = cv2.matchTemplate(coarse_screen, coarse, cv2.TM_CCOEFF_NORMED)
+        except cv2.error:
+            return None
+        best = None
+        ch, cw = coarse.shape[:2]
+        for _ in range(self.candidates):
+            _, coarse_val, _, (cx, cy) = cv2.minMaxLoc(res)
+            if coarse_val < threshold - self.coarse_slack:
+                break
+            # Suppress this peak so the next candidate is a different location
+            res[max(0, cy - ch // 2):cy + ch // 2 + 1, max(0, cx - cw // 2):cx + cw // 2 + 1] = -1
+            result = self._refine(screen, full, cx, cy)
+            if result and result[0] >= threshold and (best is None or result[0] > best[0]):
+                best = result
+        return best
+
+    def _refine(self, screen, full, cx, cy):
+        """Full-resolution match in a window around a coarse peak; the pad covers the coarse rounding error."""
+        pad = int(round(2 / self.factor))
+        h, w = full.shape[:2]
+        x1 = max(0, int(cx / self.factor) - pad)
+        y1 = max(0, int(cy / self.factor) - pad)
+        x2 = min(screen.shape[1], int(cx / self.factor) + w + pad)
+        y2 = min(screen.shape[0], int(cy / self.factor) + h + pad)
+        try:
+            res = cv2.matchTemplate(screen[y1:y2, x1:x2], full, cv2.TM_CCOEFF_NORMED)
+        except cv2.error:
+            return None
+        _, val, _, (fx, fy) = cv2.minMaxLoc(res)
+        return val, (fx + x1, fy + y1)
+
+    def reload(self, folder=None):
+        """Drop the cached scaled templates (of one template folder, or all of them)."""
+        with self._lock:
+            if folder is None:
+                self._resized.clear()
+                return
+            for key in [k for k in self._resized if os.path.dirname(os.path.normpath(k[0])) == folder]:
+                del self._resized[key]
+
+    def _scaled(self, path, template, scale):
+        key = (path, scale)
+        with self._lock:
+            cached = self._resized.get(key)
+        if cached is not None and cached[0] is template:
+            return cached[1], cached[2]
+        full = template
+        if scale != 1.0:
+            full = cv2.resize(template, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        coarse = None
+        h, w = full.shape[:2]
+        if min(h, w) * self.factor >= self.min_coarse_size:
+            coarse = cv2.resize(full, None, fx=self.factor, fy=self.factor, interpolation=cv2.INTER_AREA)
+        # A reloaded template replaces the entry of its path instead of adding one
+        with self._lock:
+            self._resized[key] = (template, full, coarse)
+        return full, coarse
+
+
+class ParallelMatcher:
+    """
+    Fans the templates of one folder out over a thread pool.
+
+    cv2.matchTemplate releases the GIL, so templates match on several cores.
+    Results are reduced in template order with the same strict ``>`` rule as
+    ``match_full``, so the chosen match is identical to a serial run.
+    """
+
+    def __init__(self, inner, executor):
+        self.inner = inner
+        self.executor = executor
+
+    def reload(self, folder=None):
+        if hasattr(self.inner, "reload"):
+            self.inner.reload(folder)
+
+    def __call__(self, screen, templates, threshold):
+        if len(templates) < 2:
+            return self.inner(screen, templates, threshold)
+        futures = [self.executor.submit(self.inner, screen, [t], threshold) for t in templates]
+        best = None
+        for future in futures:
+            result = future.result()
+            if result and (best is None or result[0] > best[0]):
+                best = result
+        return best
+
+
+MATCH_ENGINES = {
+    "full": lambda: match_full,
+    "pyramid": lambda: PyramidMatcher(factor=config.PYRAMID_FACTOR, scales=config.PYRAMID_SCALES,
+                                      candidates=config.PYRAMID_CANDIDATES),
+}
+
+
+def make_matcher(name):
+    """Build the matcher registered under ``name``."""
+    try:
+        return MATCH_ENGINES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown match engine: {name}") from None
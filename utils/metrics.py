@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Count and sum of every observation, plus a window of recent ones for quantiles."""
+
+    def __init__(self, window):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self._recent.append(value)
+
+    def quantiles(self, qs=QUANTILES):
+        ordered = sorted(self._recent)
+        if not ordered:
+            return {q: 0.0 for q in qs}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in qs}
+
+
+class Metrics:
+    """
+    Registry of timing histograms, keyed by metric name and labels.
+
+        with metrics.span("capture", device="emulator-5554"):
+            ...
+
+    Quantiles (p50/p95/p99) cover the last ``window`` observations of a
+    series; count and sum cover all of them. Export with to_prometheus()
+    (text exposition format, as summaries) or to_json().
+    """
+
+    def __init__(self, prefix="coc", window=2048):
+        self.prefix = prefix
+        self.window = window
+        self._lock = threading.Lock()
+        self._series = {}   # (name, sorted label items) -> Histogram
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the block and record it under ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None)))
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = Histogram(self.window)
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self):
+        """List of {name, labels, count, sum, max, p50, p95, p99} dicts."""
+        with self._lock:
+            series = [(name, labels, h.count, h.sum, h.max, h.quantiles()) for (name, labels), h in self._series.items()]
+        rows = []
+        for name, labels, count, total, peak, quantiles in sorted(series):
+            row = {"name": name, "labels": dict(labels), "count": count, "sum": total, "max": peak}
+            row.update({f"p{int(q * 100)}": value for q, value in quantiles.items()})
+            rows.append(row)
+        return rows
+
+    def to_json(self):
+        return json.dumps({"timestamp": time.time(), "metrics": self.snapshot()}, indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        typed = set()
+        for row in self.snapshot():
+            metric = f"{self.prefix}_{row['name']}_seconds"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} summary")
+                typed.add(metric)
+            labels = [f'{k}="{_escape(v)}"' for k, v in row["labels"].items()]
+            for q in QUANTILES:
+                quantile_labels = ",".join(labels + [f'quantile="{q}"'])
+                lines.append(f"{metric}{{{quantile_labels}}} {row[f'p{int(q * 100)}']:.6f}")
+            suffix = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{metric}_sum{suffix} {row['sum']:.6f}")
+            lines.append(f"{metric}_count{suffix} {row['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the metrics to ``path`` (.json -> JSON, anything else -> Prometheus text), atomically."""
+        text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def print_table(self, names=None):
+        """Print one line per series (optionally only some metric names)."""
+        for row in self.snapshot():
+            if names and row["name"] not in names:
+                continue
+            labels = ",".join(f"{k}={v}" for k, v in row["labels"].items())
+            label = f"{row['name']}{{{labels}}}" if labels else row["name"]
+            print(f"  {label:<48} n={row['count']:<6} p50={row['p50'] * 1000:8.2f} ms  "
+                  f"p95={row['p95'] * 1000:8.2f} ms  p99={row['p99'] * 1000:8.2f} ms  total={row['sum']:7.2f}s")
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide registry used by the device, OCR and bot hooks
+metrics = Metrics()
+
+
+class MetricsExporter:
+    """
+    Publishes a registry: rewrites ``path`` every ``interval`` seconds (for a
+    textfile collector) and/or serves /metrics (Prometheus) and /metrics.json on ``port``.
+    """
+
+    def __init__(self, registry=metrics, path=config.METRICS_FILE, port=config.METRICS_PORT,
+                 interval=config.METRICS_INTERVAL):
+        self.registry = registry
+        self.path = path
+        self.port = port
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def start(self):
+        if self.path:
+            self._thread = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+            self._thread.start()
+        if self.port:
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.port), self._handler())
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"📈 Metrics on http://127.0.0.1:{self.port}/metrics")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.path:
+            self._write()
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        try:
+            self.registry.write(self.path)
+        except OSError as e:
+            print(f"Warning: Failed to write metrics: {e}")
+
+    def _handler(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, kind = registry.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, kind = registry.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
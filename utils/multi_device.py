@@ -0,0 +1,125 @@
+import sys
+import threading
+import time
+
+import config
+from bot import CoCBot
+from deployment_config import DeploymentConfig
+from utils.device import DeviceController
+from utils.pipeline import CapturePipeline
+from utils.roi import RoiTracker
+from utils.templates import TemplateLibrary
+
+# Name of the device the current thread drives, used to tag its console output
+_context = threading.local()
+
+
+class PrefixedOutput:
+    """stdout wrapper that tags every line with the device of the thread printing it."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        prefix = getattr(_context, "name", None)
+        if prefix:
+            at_line_start = getattr(_context, "at_line_start", True)
+            parts = []
+            for line in text.splitlines(keepends=True):
+                if at_line_start:
+                    parts.append(f"[{prefix}] ")
+                parts.append(line)
+                at_line_start = line.endswith("\n")
+            _context.at_line_start = at_line_start
+            text = "".join(parts)
+        with self._lock:
+            return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class BotFleet:
+    """
+    Runs one CoCBot per device, each on its own thread, in a single process.
+
+    The decoded templates, the ROI tracker and the OCR model are loaded once
+    and shared, so every extra device only costs its own frames and threads
+    instead of a whole interpreter with its own OCR model. The devices are
+    expected to run at the same resolution. Bots share the event log (every
+    event carries its device ID) and their console lines are tagged with it.
+    """
+
+    def __init__(self, device_ids, webhook_url=None, capture_mode=config.CAPTURE_MODE,
+                 match_engine=config.MATCH_ENGINE, match_workers=config.MATCH_WORKERS,
+                 use_pipeline=config.USE_PIPELINE, event_log=None, loot_optimizer=config.LOOT_OPTIMIZER):
+        self.templates = TemplateLibrary()
+        self.rois = RoiTracker()
+        deploy_config = DeploymentConfig()
+        self.devices = []
+        self.pipelines = []
+        self.bots = []
+        for device_id in device_ids:
+            device = DeviceController(device_id=device_id, templates=self.templates, rois=self.rois,
+                                      capture_mode=capture_mode, match_engine=match_engine,
+                                      match_workers=match_workers)
+            pipeline = CapturePipeline(device, linger=config.PIPELINE_LINGER) if use_pipeline else None
+            self.devices.append(device)
+            if pipeline:
+                self.pipelines.append(pipeline)
+            self.bots.append(CoCBot(device, webhook_url=webhook_url, deployment_config=deploy_config,
+                                    pipeline=pipeline, name=device_id, event_log=event_log,
+                                    loot_optimizer=loot_optimizer))
+
+    def run(self):
+        """Run every bot until Ctrl+C, then let each finish its loop and print a summary."""
+        stdout = sys.stdout
+        sys.stdout = PrefixedOutput(stdout)
+        for pipeline in self.pipelines:
+            pipeline.start()
+        threads = [threading.Thread(target=self._run_bot, args=(bot,), name=f"bot-{bot.name}", daemon=True)
+                   for bot in self.bots]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print("\nStopping all bots after their current loop (Ctrl+C again to quit now)...")
+            for bot in self.bots:
+                bot.stop()
+            for thread in threads:
+                thread.join()
+        finally:
+            for pipeline in self.pipelines:
+                pipeline.stop()
+            for device in self.devices:
+                device.close()
+            sys.stdout = stdout
+            self.print_summary()
+
+    @staticmethod
+    def _run_bot(bot):
+        _context.name = bot.name
+        try:
+            bot.run()
+        except Exception as e:
+            print(f"❌ Bot crashed: {e}")
+
+    def print_summary(self):
+        print("\n===== MULTI-DEVICE SUMMARY =====")
+        totals = {"loops": 0, "gold": 0, "elixir": 0, "dark": 0}
+        for bot in self.bots:
+            stats = bot.stats()
+            for key in totals:
+                totals[key] += stats[key]
+            print(f"{stats['name']}: {stats['loops']} loops, Gold={stats['gold']:,} "
+                  f"Elixir={stats['elixir']:,} Dark={stats['dark']:,} in {stats['runtime_min']:.1f} min, "
+                  f"{stats['bases_per_min']:.1f} bases/min")
+        print(f"Total: {totals['loops']} loops, Gold={totals['gold']:,} "
+              f"Elixir={totals['elixir']:,} Dark={totals['dark']:,}")
+        print("================================")
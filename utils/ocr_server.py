@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Shared OCR server - one EasyOCR model for every bot process on the host.
+
+    python -m utils.ocr_server                 # listen on the default address
+    python -m utils.ocr_server --address ~/.coc_bot/ocr.sock
+
+Bots send the loot crops the digit bank couldn't read. Requests that queue up
+while a batch runs (plus any arriving within OCR_SERVER_BATCH_WINDOW, 0 by
+default) are recognised together in one EasyOCR recognition batch.
+text_detect_resource uses the server automatically while it is reachable.
+
+Connections carry pickles, so only the user running the server may connect:
+the socket sits in a private (0700) runtime directory, and clients must know
+the random key the server writes there (0600).
+"""
+import argparse
+import os
+import queue
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import config
+
+
+def runtime_dir():
+    """Per-user directory for the socket and key, created 0700; refuses one that others can access."""
+    if sys.platform == "win32":
+        path = os.path.join(os.environ.get("LOCALAPPDATA") or tempfile.gettempdir(), "coc_bot")
+        os.makedirs(path, exist_ok=True)
+        return path
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        path = os.path.join(os.environ["XDG_RUNTIME_DIR"], "coc_bot")
+    else:
+        path = os.path.join(tempfile.gettempdir(), f"coc_bot-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    _check_private(path)
+    return path
+
+
+def _check_private(path):
+    """Raise PermissionError unless ``path`` is ours and closed to group/others."""
+    if sys.platform == "win32":
+        return
+    info = os.lstat(path)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be owned by you and not accessible to others (chmod go-rwx)")
+
+
+def default_address():
+    """Socket in the runtime directory, or a per-user named pipe on Windows."""
+    if config.OCR_SERVER_ADDRESS:
+        return config.OCR_SERVER_ADDRESS
+    if sys.platform == "win32":
+        user = os.environ.get("USERNAME", "user")
+        return rf"\\.\pipe\coc_bot_ocr_{user}"
+    return os.path.join(runtime_dir(), "ocr.sock")
+
+
+def key_path():
+    return os.path.join(runtime_dir(), "ocr.key")
+
+
+def load_authkey(create=False):
+    """The server's random auth key (bytes); ``create`` writes a new one. None if there is none yet."""
+    path = key_path()
+    if create:
+        key = secrets.token_bytes(32)
+        tmp = f"{path}.{os.getpid()}"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        os.replace(tmp, path)
+        return key
+    try:
+        _check_private(path)
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+class _Request:
+    def __init__(self, regions):
+        self.regions = regions   # {resource: crop}
+        self.result = None
+        self.done = threading.Event()
+
+
+class OcrServer:
+    """
+    Serves batched OCR requests from many clients.
+
+    Every client connection gets a thread that queues its requests; a single
+    batching thread takes every queued request (up to ``max_batch``), waits up
+    to ``batch_window`` seconds after the first for more, and recognises every
+    crop of the batch in one EasyOCR recognition batch (``recognize_regions``).
+    With ``batch_window=0`` (the default) no request is delayed; requests that
+    queued up during the previous batch are still merged.
+    """
+
+    def __init__(self, address=None, authkey=None, batch_window=config.OCR_SERVER_BATCH_WINDOW, max_batch=16):
+        self.address = address or default_address()
+        self.authkey = authkey
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.requests = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+
+    def serve_forever(self):
+        from utils import text_detect_resource
+
+        text_detect_resource.get_reader()
+        self._remove_stale_socket()
+        if self.authkey is None:
+            self.authkey = load_authkey(create=True)
+        listener = Listener(self.address, authkey=self.authkey)
+        print(f"✅ OCR server listening on {self.address}")
+        threading.Thread(target=self._batch_loop, name="ocr-batcher", daemon=True).start()
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, OSError, EOFError) as e:
+                    print(f"⚠️ Rejected OCR client: {e}")
+                    continue
+                threading.Thread(target=self._client_loop, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+    def _remove_stale_socket(self):
+        """Drop a socket file left by a crashed server; refuse to start if one is live."""
+        if sys.platform == "win32" or not os.path.exists(self.address):
+            return
+        try:
+            Client(self.address, authkey=self.authkey or load_authkey()).close()
+        except (AuthenticationError, OSError, EOFError):
+            os.unlink(self.address)
+            return
+        raise SystemExit(f"An OCR server is already running on {self.address}")
+
+    def _client_loop(self, conn):
+        try:
+            while True:
+                request = _Request(conn.recv())
+                self._queue.put(request)
+                request.done.wait()
+                conn.send(request.result)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _batch_loop(self):
+        from utils.text_detect_resource import get_image_values, parse_ocr_text, recognize_regions
+
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.time()
+                try:
+                    # Requests already waiting always join; then wait out the window
+                    batch.append(self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                regions = {(i, name): crop for i, request in enumerate(batch)
+                           for name, crop in request.regions.items()}
+                texts = recognize_regions(regions) if regions else {}
+                for i, request in enumerate(batch):
+                    if texts is None:
+                        request.result = {name: get_image_values(crop, name) for name, crop in request.regions.items()}
+                    else:
+                        request.result = {name: parse_ocr_text(texts[(i, name)], name) for name in request.regions}
+            except Exception as e:
+                # A None answer makes the clients read locally; never leave them waiting
+                print(f"⚠️ OCR batch failed: {e}")
+                for request in batch:
+                    request.result = None
+            finally:
+                for request in batch:
+                    request.done.set()
+
+            self.requests += len(batch)
+            self.batches += 1
+            if self.batches % 100 == 0:
+                print(f"OCR server: {self.requests} requests in {self.batches} batches "
+                      f"({self.requests / self.batches:.2f} per batch)")
+
+
+class OcrClient:
+    """Connection to an OcrServer; safe to share between threads."""
+
+    def __init__(self, address=None, authkey=None, timeout=config.OCR_SERVER_TIMEOUT):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Connect to the server; raises OSError if it isn't running (no key yet, no socket)."""
+        self.address = self.address or default_address()
+        authkey = self.authkey or load_authkey()
+        if authkey is None:
+            raise FileNotFoundError("no OCR server key")
+        self._conn = Client(self.address, authkey=authkey)
+
+    @property
+    def connected(self):
+        return self._conn is not None
+
+    def read(self, regions):
+        """OCR {resource: crop} on the server; returns {resource: value}, or None if the server is gone."""
+        with self._lock:
+            if self._conn is None:
+                return None
+            try:
+                self._conn.send(regions)
+                if not self._conn.poll(self.timeout):
+                    # A late answer would be taken for the next request's: drop the connection
+                    print(f"⚠️ OCR server did not answer within {self.timeout}s, using local OCR")
+                    self.close()
+                    return None
+                return self._conn.recv()
+            except (EOFError, OSError) as e:
+                print(f"⚠️ OCR server connection lost ({e}), using local OCR")
+                self.close()
+                return None
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+
+
+_client = OcrClient()
+_client_lock = threading.Lock()
+_last_attempt = 0.0
+
+
+def get_client():
+    """The shared client if the server is reachable (reconnects at most every OCR_SERVER_RETRY s), else None."""
+    global _last_attempt
+    if _client.connected:
+        return _client
+    with _client_lock:
+        if not _client.connected and time.time() - _last_attempt >= config.OCR_SERVER_RETRY:
+            _last_attempt = time.time()
+            try:
+                _client.connect()
+                print(f"✅ Using shared OCR server at {_client.address}")
+            except (AuthenticationError, OSError, EOFError):
+                pass
+    return _client if _client.connected else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared OCR server for bot processes")
+    parser.add_argument("--address", default=default_address(), help="Unix socket path or named pipe")
+    parser.add_argument("--batch-window", type=float, default=config.OCR_SERVER_BATCH_WINDOW,
+                        help="Seconds to wait for more requests before running a batch")
+    args = parser.parse_args()
+
+    # The server does the OCR itself; it must never try to forward to another server
+    config.OCR_SERVER = False
+    try:
+        OcrServer(args.address, batch_window=args.batch_window).serve_forever()
+    except KeyboardInterrupt:
+        print("\nOCR server stopped.")
+
+
+if __name__ == "__main__":
+    main()
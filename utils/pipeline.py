@@ -0,0 +1,148 @@
+import itertools
+import queue
+import threading
+import time
+
+
+class Decision:
+    """Detection results for one captured frame."""
+
+    def __init__(self, frame, hits, captured_at, seq=0):
+        self.frame = frame
+        self.hits = hits
+        self.captured_at = captured_at  # when the capture was started
+        self.seq = seq                  # capture order within the pipeline
+        self.analysed_at = time.time()
+
+
+class CapturePipeline:
+    """
+    Double-buffered capture/analysis pipeline.
+
+    A capture thread prefetches the next frame from the device while an analysis
+    thread runs ``detect_many`` for the watched folders on the previous one.
+    Frames go through a bounded queue, numbered in capture order; once it is
+    full the capture thread waits for analysis to take a frame, so the device
+    is never captured faster than frames are analysed. A queued frame taken
+    before the latest ``after`` time (e.g. before a tap) is replaced by a fresh
+    one. The capture thread never touches ``device.last_frame``. Work is
+    demand-driven: capturing pauses ``linger`` seconds after the last
+    ``next_decision`` call, and never starts before the ``after`` time that
+    call asked for.
+    """
+
+    def __init__(self, device, max_queue=1, linger=1.0, threshold=0.8):
+        self.device = device
+        self.linger = linger
+        self.threshold = threshold
+        self.frames_dropped = 0
+        self._frames = queue.Queue(maxsize=max_queue)
+        self._seq = itertools.count(1)
+        self._cond = threading.Condition()
+        self._folders = ()
+        self._generation = 0
+        self._decision = None       # (generation, Decision)
+        self._demand_until = 0.0
+        self._capture_after = 0.0
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="pipeline-capture", daemon=True),
+            threading.Thread(target=self._analysis_loop, name="pipeline-analysis", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def next_decision(self, folders, after=None, timeout=5.0, newer_than=None):
+        """
+        Wait for a Decision covering ``folders`` from a frame captured after ``after``
+        (a time.time() value, e.g. the last tap) and, with ``newer_than`` (a Decision),
+        later than that one's frame. Returns None on timeout.
+        """
+        folders = tuple(folders)
+        deadline = time.time() + timeout
+        with self._cond:
+            if folders != self._folders:
+                self._folders = folders
+                self._generation += 1
+            generation = self._generation
+            self._capture_after = after or 0.0
+            while True:
+                self._demand_until = max(time.time(), self._capture_after) + self.linger
+                self._cond.notify_all()
+                if self._decision:
+                    gen, decision = self._decision
+                    if gen == generation and (after is None or decision.captured_at > after) \
+                            and (newer_than is None or decision.seq > newer_than.seq):
+                        return decision
+                remaining = deadline - time.time()
+                if remaining <= 0 or self._stop.is_set():
+                    return None
+                self._cond.wait(min(remaining, self.linger / 2))
+
+    def _capture_loop(self):
+        previous = None
+        queued_at = 0.0  # capture start of the newest queued frame
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._stop.is_set():
+                    now = time.time()
+                    if now > self._demand_until:
+                        self._cond.wait(0.5)
+                    elif now < self._capture_after:
+                        self._cond.wait(self._capture_after - now)
+                    elif self._frames.full() and queued_at >= self._capture_after:
+                        # Frames are waiting for analysis: don't capture ahead of it
+                        self._cond.wait(0.5)
+                    else:
+                        break
+            if self._stop.is_set():
+                return
+            started = time.time()
+            frame = self.device.capture(newer_than=previous)
+            if frame is None:
+                self._stop.wait(0.2)
+                continue
+            previous = frame
+            queued_at = started
+            item = (next(self._seq), frame, started)
+            try:
+                self._frames.put_nowait(item)
+            except queue.Full:
+                # The queued frame predates the last tap: replace it with the fresh one
+                try:
+                    self._frames.get_nowait()
+                    self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+                self._frames.put_nowait(item)
+
+    def _analysis_loop(self):
+        while not self._stop.is_set():
+            try:
+                seq, frame, started = self._frames.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            # Frames don't depend on what is watched: analyse for the folders wanted right now
+            with self._cond:
+                generation = self._generation
+                folders = self._folders
+                self._cond.notify_all()  # room in the queue for the next capture
+            hits = self.device.detect_many(folders, frame, self.threshold) if folders else {}
+            with self._cond:
+                if generation == self._generation:
+                    self._decision = (generation, Decision(frame, hits, started, seq))
+                    self._cond.notify_all()
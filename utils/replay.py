@@ -0,0 +1,157 @@
+import glob
+import json
+import os
+import random
+import time as _time
+from contextlib import contextmanager
+
+from utils.device import DeviceController
+from utils.frame import Frame
+from utils.roi import RoiTracker
+
+
+class VirtualClock:
+    """
+    Stand-in for the ``time`` module during replays.
+
+    Sleeps return at once and only move the clock forward, so fixed waits
+    (deploy pauses, button timeouts) cost no real time, while the compute
+    between them still advances it at the real rate. time() and
+    perf_counter() follow the virtual clock; anything else is forwarded to
+    the real ``time`` module.
+    """
+
+    def __init__(self):
+        self._real_start = _time.time()
+        self._slept = 0.0
+        self._perf_start = _time.perf_counter()
+
+    def time(self):
+        return self._real_start + (_time.perf_counter() - self._perf_start) + self._slept
+
+    def perf_counter(self):
+        return _time.perf_counter() - self._perf_start + self._slept
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self._slept += seconds
+
+    @property
+    def slept(self):
+        return self._slept
+
+    def __getattr__(self, name):
+        return getattr(_time, name)
+
+
+class ReplayDeviceController(DeviceController):
+    """
+    DeviceController that plays back a recorded session instead of a device.
+
+    A session is a folder of screenshots. ``session.json`` lists them in order:
+
+        {"frames": [
+            {"file": "home.png", "advance": "tap"},
+            {"file": "search_1.png", "advance": "tap", "tap_region": [1650, 800, 1900, 950]},
+            {"file": "battle_1.png", "advance": 20},
+            ...
+        ]}
+
+    A frame with ``"advance": "tap"`` stays on screen until a tap lands (inside
+    ``tap_region`` when given); a number advances after that many seconds on
+    the ``clock``. Without session.json the sorted *.png files each advance on
+    a tap. Template matching is the real code; taps are recorded in ``taps``.
+    """
+
+    def __init__(self, session_dir, clock=None, loop=True, **kwargs):
+        kwargs.setdefault("persistent_shell", False)
+        # Windows learned on replayed frames stay in memory, not in ROI_CACHE_FILE
+        kwargs.setdefault("rois", RoiTracker(path=None))
+        super().__init__(device_id="replay", capture_mode="png", **kwargs)
+        self.session_dir = session_dir
+        self.clock = clock or _time
+        self.loop = loop
+        self.frames = self._load_session(session_dir)
+        if not self.frames:
+            raise ValueError(f"No frames in replay session: {session_dir}")
+        self.taps = []        # (time, x, y) of every tap
+        self.captures = 0
+        self.rewind()
+
+    @staticmethod
+    def _load_session(session_dir):
+        """Return a list of (png bytes, advance, tap_region)."""
+        manifest = os.path.join(session_dir, "session.json")
+        if os.path.exists(manifest):
+            with open(manifest, "r", encoding="utf-8") as f:
+                entries = json.load(f)["frames"]
+        else:
+            entries = [{"file": os.path.basename(p)}
+                       for p in sorted(glob.glob(os.path.join(session_dir, "*.png")))]
+        frames = []
+        for entry in entries:
+            with open(os.path.join(session_dir, entry["file"]), "rb") as f:
+                data = f.read()
+            region = entry.get("tap_region")
+            frames.append((data, entry.get("advance", "tap"), tuple(region) if region else None))
+        return frames
+
+    def rewind(self):
+        """Go back to the first frame."""
+        self.index = 0
+        self.entered_at = self.clock.time()
+
+    @property
+    def finished(self):
+        """True once a non-looping replay has shown its last frame."""
+        return not self.loop and self.index == len(self.frames) - 1
+
+    def _advance(self, now):
+        if self.index + 1 < len(self.frames):
+            self.index += 1
+        elif self.loop:
+            self.index = 0
+        self.entered_at = now
+
+    def _capture(self, newer_than):
+        """Decode the frame on screen at the clock's current time (PNG decode, like a png capture)."""
+        now = self.clock.time()
+        while True:
+            advance = self.frames[self.index][1]
+            if advance == "tap" or now - self.entered_at < advance or self.finished:
+                break
+            self._advance(self.entered_at + advance)
+        frame = Frame.from_png_bytes(self.frames[self.index][0], timestamp=now)
+        if frame is None:
+            return None
+        self.captures += 1
+        return frame
+
+    def _tap(self, x, y, offset):
+        tx = x + random.randint(-offset, offset)
+        ty = y + random.randint(-offset, offset)
+        now = self.clock.time()
+        self.taps.append((now, tx, ty))
+        self.last_input = now
+        _, advance, region = self.frames[self.index]
+        if advance == "tap" and (region is None or (region[0] <= tx <= region[2] and region[1] <= ty <= region[3])):
+            self._advance(now)
+
+    def _tap_batch(self, points, offset, interval):
+        for i, (x, y) in enumerate(points):
+            if i:
+                self.clock.sleep(random.uniform(*interval) if isinstance(interval, tuple) else interval)
+            self._tap(x, y, offset)
+
+
+@contextmanager
+def virtual_time(clock, *modules):
+    """Point each module's ``time`` at ``clock`` for the duration of the block."""
+    saved = [(module, module.time) for module in modules]
+    for module in modules:
+        module.time = clock
+    try:
+        yield clock
+    finally:
+        for module, original in saved:
+            module.time = original
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+from collections import deque
+
+import config
+
+
+class RoiTracker:
+    """
+    Search windows for template folders.
+
+    A folder's ROI is either configured (config.TEMPLATE_ROIS) or learned from
+    where its templates were found: once a folder has ``min_hits`` hits inside
+    its bounds, the bounds padded by ``margin`` become its window. A hit outside
+    the bounds only widens them once ``widen_hits`` hits overlap in that area,
+    so a single false positive elsewhere on screen is never learned (while the
+    window is unconfirmed, such a cluster replaces the bounds instead).
+    Learned windows are persisted to ``path`` so they survive restarts;
+    reset() forgets them.
+    """
+
+    def __init__(self, configured=None, path=config.ROI_CACHE_FILE,
+                 min_hits=config.ROI_MIN_HITS, margin=config.ROI_MARGIN,
+                 widen_hits=config.ROI_WIDEN_HITS):
+        self.configured = {os.path.normpath(k): tuple(v)
+                           for k, v in (config.TEMPLATE_ROIS if configured is None else configured).items()}
+        self.path = path
+        self.min_hits = min_hits
+        self.margin = margin
+        self.widen_hits = max(1, widen_hits)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._hits = {}     # folder -> number of hits inside the bounds
+        self._bounds = {}   # folder -> union of accepted hit rectangles (x1, y1, x2, y2)
+        self._outside = {}  # folder -> recent hit rectangles outside the bounds
+        self._load()
+
+    def get(self, folder, shape):
+        """Return the (x1, y1, x2, y2) window for a folder clipped to the frame, or None."""
+        key = os.path.normpath(folder)
+        roi = self.configured.get(key)
+        if roi is None:
+            with self._lock:
+                if self._hits.get(key, 0) < self.min_hits:
+                    return None
+                x1, y1, x2, y2 = self._bounds[key]
+            m = self.margin
+            roi = (x1 - m, y1 - m, x2 + m, y2 + m)
+        h, w = shape[:2]
+        x1, y1, x2, y2 = max(0, roi[0]), max(0, roi[1]), min(w, roi[2]), min(h, roi[3])
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2, y2
+
+    def record(self, folder, rect):
+        """Record a hit rectangle (x1, y1, x2, y2) in full-frame coordinates."""
+        key = os.path.normpath(folder)
+        rect = tuple(rect)
+        with self._lock:
+            old = self._bounds.get(key)
+            if old is None:
+                new, hits = rect, 1
+            elif _contains(old, rect):
+                new, hits = old, self._hits.get(key, 0) + 1
+            else:
+                outside = self._outside.setdefault(key, deque(maxlen=4 * self.widen_hits))
+                outside.append(rect)
+                cluster = [r for r in outside if _overlaps(r, rect)]
+                if len(cluster) < self.widen_hits:
+                    return
+                for r in cluster:
+                    outside.remove(r)
+                if self._hits.get(key, 0) < self.min_hits:
+                    # Not confirmed yet: the earlier bounds may be the false positive
+                    new, hits = _union(cluster), len(cluster)
+                else:
+                    new, hits = _union([old] + cluster), self._hits[key] + len(cluster)
+            self._hits[key] = hits
+            self._bounds[key] = new
+            changed = new != old or hits <= self.min_hits
+        if changed and self.path:
+            self._save()
+
+    def reset(self, folder=None):
+        """Forget the learned window of one folder (default: all of them)."""
+        with self._lock:
+            keys = list(self._bounds) if folder is None else [os.path.normpath(folder)]
+            for key in keys:
+                self._hits.pop(key, None)
+                self._bounds.pop(key, None)
+                self._outside.pop(key, None)
+        if self.path:
+            self._save()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Warning: Failed to load ROI cache: {e}")
+            return
+        for key, entry in data.items():
+            self._hits[key] = entry.get("hits", 0)
+            self._bounds[key] = tuple(entry["bounds"])
+
+    def _save(self):
+        """Write the learned windows atomically (record() runs on several threads)."""
+        with self._save_lock:
+            with self._lock:
+                data = {k: {"hits": self._hits[k], "bounds": list(v)} for k, v in self._bounds.items()}
+            tmp = f"{self.path}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp, self.path)
+            except IOError as e:
+                print(f"Warning: Failed to save ROI cache: {e}")
+
+
+def _contains(outer, rect):
+    return outer[0] <= rect[0] and outer[1] <= rect[1] and rect[2] <= outer[2] and rect[3] <= outer[3]
+
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _union(rects):
+    return (min(r[0] for r in rects), min(r[1] for r in rects),
+            max(r[2] for r in rects), max(r[3] for r in rects))
@@ -0,0 +1,160 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import cv2
+
+from utils.frame import Frame
+
+
+class StreamCapture:
+    """
+    Continuous screen capture from an H.264 stream.
+
+    Live mode runs `adb exec-out screenrecord --output-format=h264 -` and feeds
+    it, through a FIFO, to OpenCV's FFmpeg decoder on a background thread; the
+    newest decoded frame is kept with its timestamp. screenrecord stops after
+    its time limit, so the recorder is restarted whenever it exits.
+
+    With ``source`` set to a recorded stream file (e.g. the output of the same
+    screenrecord command) frames are decoded from the file instead, optionally
+    paced at ``fps`` to mimic a live device. Live mode needs a POSIX FIFO.
+    """
+
+    def __init__(self, device_id=None, source=None, bit_rate=8_000_000, fps=None, loop=False):
+        self.device_id = device_id
+        self.source = source
+        self.bit_rate = bit_rate
+        self.fps = fps
+        self.loop = loop
+        self.frames_decoded = 0
+        self._latest = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._recorder = None
+        self._tmpdir = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start decoding in the background."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stream-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the recorder and the decoder thread."""
+        self._stop.set()
+        self._kill_recorder()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def join(self, timeout=None):
+        """Wait for the decoder to finish (end of a recorded file)."""
+        if self._thread:
+            self._thread.join(timeout)
+
+    def latest(self):
+        """Newest decoded frame (or None)."""
+        with self._cond:
+            return self._latest
+
+    def wait_frame(self, newer_than=None, timeout=2.0):
+        """
+        Block until a frame newer than ``newer_than`` (a Frame or timestamp) is decoded.
+        Returns it, or None on timeout.
+        """
+        if isinstance(newer_than, Frame):
+            newer_than = newer_than.timestamp
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._latest is None or (newer_than is not None and self._latest.timestamp <= newer_than):
+                remaining = deadline - time.time()
+                if remaining <= 0 or (not self.running and self._latest is None):
+                    return None
+                self._cond.wait(remaining)
+            return self._latest
+
+    def _run(self):
+        while not self._stop.is_set():
+            url = self.source if self.source else self._start_recorder()
+            if url is None:
+                return
+            self._decode(url)
+            self._kill_recorder()
+            if self.source and not self.loop:
+                return
+            if not self.source:
+                # screenrecord hit its time limit or the device dropped: reconnect after a short pause
+                self._stop.wait(0.5)
+
+    def _decode(self, url):
+        cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+        if not cap.isOpened():
+            print(f"⚠️ Could not open video stream: {url}")
+            self._stop.wait(1)
+            return
+        interval = 1.0 / self.fps if self.fps else 0
+        try:
+            while not self._stop.is_set():
+                ok, image = cap.read()
+                if not ok:
+                    return
+                frame = Frame(image)
+                with self._cond:
+                    self._latest = frame
+                    self.frames_decoded += 1
+                    self._cond.notify_all()
+                if interval:
+                    time.sleep(interval)
+        finally:
+            cap.release()
+
+    def _start_recorder(self):
+        """Start screenrecord on the device piping into a FIFO; returns the FIFO path."""
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="coc_stream_")
+        fifo = os.path.join(self._tmpdir, "screen.h264")
+        if not os.path.exists(fifo):
+            os.mkfifo(fifo)
+
+        cmd = ["adb"] + (["-s", self.device_id] if self.device_id else []) + [
+            "exec-out", "screenrecord", "--output-format=h264",
+            f"--bit-rate={self.bit_rate}", "-",
+        ]
+        try:
+            self._recorder = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"⚠️ Failed to start screenrecord: {e}")
+            return None
+        threading.Thread(target=self._pump, args=(self._recorder, fifo), daemon=True).start()
+        return fifo
+
+    @staticmethod
+    def _pump(recorder, fifo):
+        """Copy recorder output into the FIFO the decoder reads."""
+        try:
+            with open(fifo, "wb") as out:
+                while True:
+                    chunk = recorder.stdout.read(65536)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+        except OSError:
+            pass
+
+    def _kill_recorder(self):
+        recorder, self._recorder = self._recorder, None
+        if recorder and recorder.poll() is None:
+            recorder.kill()
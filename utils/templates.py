@@ -0,0 +1,118 @@
+import glob
+import os
+import threading
+import time
+
+import cv2
+
+import config
+
+
+class TemplateLibrary:
+    """In-memory registry of UI templates, keyed by folder path.
+
+    Scans the template root once, decodes every image up front and serves the
+    decoded arrays on request. Folders are re-scanned (at most every
+    ``reload_interval`` seconds) so templates added or replaced on disk are
+    picked up without restarting the bot.
+    """
+
+    def __init__(self, root=config.TEMPLATE_ROOT, grayscale=False, scale=1.0,
+                 reload_interval=config.TEMPLATE_RELOAD_INTERVAL, verbose=False):
+        self.root = root
+        self.grayscale = grayscale
+        self.scale = scale
+        self.reload_interval = reload_interval
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._templates = {}   # folder key -> list of (path, image)
+        self._signatures = {}  # folder key -> folder signature at load time
+        self._checked_at = {}  # folder key -> last time the signature was checked
+        self._reload_listeners = []
+        self.preload()
+
+    def add_reload_listener(self, callback):
+        """Call ``callback(folder_key)`` whenever a loaded folder is reloaded."""
+        self._reload_listeners.append(callback)
+
+    @staticmethod
+    def key(folder):
+        """Normalise a folder path into a registry key."""
+        return os.path.normpath(folder)
+
+    def preload(self):
+        """Load every template folder under the root."""
+        if not os.path.isdir(self.root):
+            return
+        start = time.time()
+        count = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            if any(self._is_image(f) for f in filenames):
+                count += len(self._load(self.key(dirpath)))
+        if self.verbose:
+            print(f"Loaded {count} templates from {self.root} in {time.time() - start:.2f}s")
+
+    def get(self, folder):
+        """Return the list of (path, image) templates for a folder."""
+        key = self.key(folder)
+        with self._lock:
+            templates = self._templates.get(key)
+            checked_at = self._checked_at.get(key, 0)
+        if templates is None:
+            return self._load(key)
+        if self.reload_interval is not None and time.time() - checked_at >= self.reload_interval:
+            self._checked_at[key] = time.time()
+            if self._signature(key) != self._signatures.get(key):
+                if self.verbose:
+                    print(f"Templates changed, reloading: {key}")
+                return self.reload(key)
+        return templates
+
+    def reload(self, folder):
+        """Re-read a folder from disk and notify the reload listeners."""
+        key = self.key(folder)
+        templates = self._load(key)
+        for callback in self._reload_listeners:
+            callback(key)
+        return templates
+
+    def folders(self):
+        """Return the keys of every loaded folder."""
+        with self._lock:
+            return sorted(self._templates)
+
+    def _load(self, key):
+        """Decode every template in a folder and store it under ``key``."""
+        signature = self._signature(key)
+        templates = []
+        for path in sorted(glob.glob(os.path.join(key, '*'))):
+            if not self._is_image(path):
+                continue
+            image = cv2.imread(path, cv2.IMREAD_GRAYSCALE if self.grayscale else cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            if self.scale != 1.0:
+                image = cv2.resize(image, None, fx=self.scale, fy=self.scale,
+                                   interpolation=cv2.INTER_AREA)
+            templates.append((path, image))
+        with self._lock:
+            self._templates[key] = templates
+            self._signatures[key] = signature
+            self._checked_at[key] = time.time()
+        return templates
+
+    @staticmethod
+    def _signature(key):
+        """Cheap change marker: names, sizes and mtimes of the folder's files."""
+        try:
+            with os.scandir(key) as entries:
+                return tuple(sorted(
+                    (e.name, e.stat().st_size, e.stat().st_mtime_ns)
+                    for e in entries if e.is_file()
+                ))
+        except OSError:
+            return None
+
+    @staticmethod
+    def _is_image(path):
+        return path.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp'))
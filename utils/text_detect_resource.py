@@ -1,23 +1,151 @@
 import cv2
+import hashlib
+import numpy as np
 import re
-import easyocr
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 import warnings
 
+import config
+from utils.digit_ocr import get_recognizer
+from utils.frame import as_image
+from utils.metrics import metrics
+
 warnings.filterwarnings("ignore", category=UserWarning)
 
-try:
-    import torch
+# EasyOCR pulls in torch and loads its models, which takes seconds; it is only
+# built on first use (or by warm_up) so importing this module stays cheap.
+_easyocr_reader = None
+_reader_lock = threading.Lock()
+# One model serves every bot in the process (multi-device mode); inference calls take turns
+_inference_lock = threading.Lock()
+
+
+def _gpu_available():
+    try:
+        import torch
+
+        return bool(
+            getattr(torch, "cuda", None) and torch.cuda.is_available()
+        ) or bool(
+            getattr(torch.backends, "mps", None) and torch.backends.mps.is_available()
+        )
+    except Exception:
+        return False
+
+
+def get_reader():
+    """Return the shared EasyOCR reader, creating it on first call."""
+    global _easyocr_reader
+    if _easyocr_reader is None:
+        with _reader_lock:
+            if _easyocr_reader is None:
+                import easyocr
+
+                start = time.time()
+                _easyocr_reader = easyocr.Reader(["en"], gpu=_gpu_available(), verbose=False)
+                print(f"OCR model loaded in {time.time() - start:.1f}s")
+    return _easyocr_reader
+
+
+def _server_client():
+    """Client of the shared OCR server, or None when disabled or unreachable."""
+    if not config.OCR_SERVER:
+        return None
+    from utils.ocr_server import get_client
+
+    return get_client()
+
+
+def _warm_up():
+    if _server_client() is None:
+        get_reader()
+
+
+def warm_up(background=True):
+    """
+    Load the OCR model ahead of first use, optionally on a daemon thread.
+    Nothing is loaded when the shared OCR server is reachable; with OCR worker
+    processes the model is loaded in the workers instead.
+    """
+    if config.OCR_PROCESS_WORKERS > 0:
+        future = get_ocr_pool().submit(_warm_up)
+        return None if background else future.result()
+    if not background:
+        _warm_up()
+        return None
+    thread = threading.Thread(target=_warm_up, name="ocr-warmup", daemon=True)
+    thread.start()
+    return thread
+
 
-    _gpu_available = bool(
-        getattr(torch, "cuda", None) and torch.cuda.is_available()
-    ) or bool(
-        getattr(torch.backends, "mps", None) and torch.backends.mps.is_available()
-    )
-except Exception:
-    _gpu_available = False
+class OcrCache:
+    """Bounded LRU of OCR results keyed by a hash of the crop's pixels."""
 
-_easyocr_reader = easyocr.Reader(["en"], gpu=_gpu_available, verbose=False)
+    def __init__(self, maxsize=config.OCR_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(resource_type, region):
+        # CLAHE preprocessing is deterministic, so hashing the raw crop keys the same
+        # reads as hashing the preprocessed one and spares the preprocessing on a hit
+        region = np.ascontiguousarray(region)
+        digest = hashlib.blake2b(region.data, digest_size=16)
+        digest.update(repr(region.shape).encode())
+        return resource_type, digest.digest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
+
+
+_ocr_cache = OcrCache()
+
+
+def ocr_cache_stats():
+    """Hit/miss counters of the OCR result cache."""
+    return _ocr_cache.stats()
+
+
+# Loot panel regions (x1, y1, x2, y2) on the base-search screen
+RESOURCE_BBOXES = {
+    "gold": (65, 95, 200, 120),
+    "elixir": (65, 135, 200, 160),
+    "dark_elixir": (65, 175, 170, 200),
+}
 
 
 def preprocess_for_ocr(image):
@@ -38,13 +166,31 @@ def get_image_values(image, resource_type="default"):
     if image is None or image.size == 0:
         return 0
 
+    # Fixed-font digit bank first; EasyOCR only when the fast read is doubtful
+    if config.DIGIT_OCR:
+        value, confidence = get_recognizer().read(image)
+        if value is not None and confidence >= config.DIGIT_MIN_CONFIDENCE:
+            return clamp_value(value, resource_type)
+
+    client = _server_client()
+    served = client.read({resource_type: image}) if client else None
+    if served is not None:
+        return served[resource_type]
+
     processed = preprocess_for_ocr(image)
 
     try:
-        results = _easyocr_reader.readtext(processed, detail=0)
+        reader = get_reader()
+        with _inference_lock:
+            results = reader.readtext(processed, detail=0)
     except Exception:
         return 0
 
+    return parse_ocr_text(results, resource_type)
+
+
+def parse_ocr_text(results, resource_type="default"):
+    """Turn EasyOCR text fragments into a resource value."""
     if not results:
         return 0
 
@@ -75,6 +221,11 @@ def get_image_values(image, resource_type="default"):
         except ValueError:
             value = 0
 
+    return clamp_value(value, resource_type)
+
+
+def clamp_value(value, resource_type="default"):
+    """Drop misread extra digits so a value stays within the resource's cap."""
     if value <= 0:
         return 0
 
@@ -91,27 +242,214 @@ def get_image_values(image, resource_type="default"):
     return max(0, min(value, max_val))
 
 
-def get_resource_values(screenshot_path):
-    """Extract all resource values from a screenshot."""
-    img = cv2.imread(screenshot_path)
+def _cached_values(screenshot, resources=None):
+    """
+    Split a screenshot's loot regions (all, or just ``resources``) into cached
+    values and crops still to read. Returns (values, keys, misses), or None if there is no image.
+    """
+    img = as_image(screenshot)
     if img is None:
-        return {"gold": 0, "elixir": 0, "dark_elixir": 0}
+        return None
 
-    gold_bbox = (65, 95, 200, 120)
-    elixir_bbox = (65, 135, 200, 160)
-    dark_bbox = (65, 175, 170, 200)
+    regions = {
+        resource: img[y1:y2, x1:x2]
+        for resource, (x1, y1, x2, y2) in RESOURCE_BBOXES.items()
+        if resources is None or resource in resources
+    }
+
+    # Unchanged loot panels (slow "next" transitions, retries) are answered from the cache
+    values = {}
+    keys = {}
+    for resource, region in regions.items():
+        if region.size == 0:
+            values[resource] = 0
+            continue
+        keys[resource] = OcrCache.key(resource, region)
+        cached = _ocr_cache.get(keys[resource])
+        if cached is not None:
+            values[resource] = cached
+    misses = {resource: region for resource, region in regions.items() if resource not in values}
+    return values, keys, misses
+
+
+def _store_values(values, keys, misses, read, resources=None):
+    values.update(read)
+    for resource, key in keys.items():
+        if resource in misses:
+            _ocr_cache.put(key, values[resource])
+    return {resource: values.get(resource, 0) for resource in resources or RESOURCE_BBOXES}
+
+
+def get_resource_values(screenshot, batched=config.OCR_BATCHED, resources=None):
+    """
+    Extract resource values from a screenshot (Frame, image array or path).
+    ``resources`` limits the read to some of the RESOURCE_BBOXES keys.
+    """
+    with metrics.span("ocr"):
+        return _get_resource_values(screenshot, batched, resources)
+
+
+def _get_resource_values(screenshot, batched, resources):
+    lookup = _cached_values(screenshot, resources)
+    if lookup is None:
+        return {resource: 0 for resource in resources or RESOURCE_BBOXES}
+    values, keys, misses = lookup
+
+    if not batched:
+        read = {resource: get_image_values(region, resource) for resource, region in misses.items()}
+    else:
+        read = _read_uncached(misses)
+    return _store_values(values, keys, misses, read, resources)
+
+
+# OCR executor used by submit_resource_values: worker processes (each loading the
+# model once) when OCR_PROCESS_WORKERS > 0, otherwise one background thread
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    global _ocr_pool
+    if _ocr_pool is None:
+        with _ocr_pool_lock:
+            if _ocr_pool is None:
+                if config.OCR_PROCESS_WORKERS > 0:
+                    # spawn: forking a process that already runs capture threads (or torch) is unsafe
+                    _ocr_pool = ProcessPoolExecutor(config.OCR_PROCESS_WORKERS,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    _ocr_pool = ThreadPoolExecutor(1, thread_name_prefix="ocr")
+    return _ocr_pool
+
+
+def _discard_ocr_pool(pool):
+    """Forget a pool whose worker died, so the next get_ocr_pool() builds a new one."""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is pool:
+            _ocr_pool = None
+            print("⚠️ OCR worker died, restarting the OCR pool")
+    pool.shutdown(wait=False)
 
-    gold_region = img[gold_bbox[1] : gold_bbox[3], gold_bbox[0] : gold_bbox[2]]
-    elixir_region = img[
-        elixir_bbox[1] : elixir_bbox[3], elixir_bbox[0] : elixir_bbox[2]
-    ]
-    dark_region = img[dark_bbox[1] : dark_bbox[3], dark_bbox[0] : dark_bbox[2]]
 
-    gold_value = get_image_values(gold_region, "gold")
-    elixir_value = get_image_values(elixir_region, "elixir")
-    dark_value = get_image_values(dark_region, "dark_elixir")
+def submit_resource_values(screenshot, resources=None):
+    """
+    Start reading a screenshot's resource values without waiting for them.
+    Cache hits are answered at once; everything else is read on the OCR pool.
+    Returns a Future of the values dict (the same one get_resource_values returns).
+    Raises BrokenProcessPool if an OCR worker has died (the pool is rebuilt on the next call).
+    """
+    result = Future()
+    # Timed from submission to result, i.e. how long a caller joining at once would wait
+    start = time.perf_counter()
+    result.add_done_callback(lambda _: metrics.observe("ocr", time.perf_counter() - start))
+    lookup = _cached_values(screenshot, resources)
+    if lookup is None:
+        result.set_result({resource: 0 for resource in resources or RESOURCE_BBOXES})
+        return result
+    values, keys, misses = lookup
+    if not misses:
+        result.set_result(_store_values(values, keys, misses, {}, resources))
+        return result
+
+    def done(future):
+        try:
+            result.set_result(_store_values(values, keys, misses, future.result(), resources))
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                _discard_ocr_pool(pool)
+            result.set_exception(e)
+
+    pool = get_ocr_pool()
+    try:
+        future = pool.submit(_read_uncached, misses)
+    except BrokenProcessPool:
+        _discard_ocr_pool(pool)
+        raise
+    future.add_done_callback(done)
+    return result
+
+
+def _read_uncached(regions):
+    """Digit bank first, then one batched EasyOCR call (shared server or local) for whatever is left."""
+    values = {}
+    pending = {}
+    for resource, region in regions.items():
+        if config.DIGIT_OCR:
+            value, confidence = get_recognizer().read(region)
+            if value is not None and confidence >= config.DIGIT_MIN_CONFIDENCE:
+                values[resource] = clamp_value(value, resource)
+                continue
+        pending[resource] = region
+
+    if pending:
+        client = _server_client()
+        served = client.read(pending) if client else None
+        values.update(served if served is not None else read_regions_batched(pending))
+    return values
+
+
+def read_regions_batched(regions):
+    """
+    OCR several crops in one EasyOCR recognition batch.
+    Returns {name: value}; names are resource types.
+    """
+    texts = recognize_regions(regions)
+    if texts is None:
+        return {name: get_image_values(region, name) for name, region in regions.items()}
+    return {name: parse_ocr_text(texts[name], name) for name in regions}
+
+
+def recognize_regions(regions):
+    """
+    Run EasyOCR recognition on several crops in one batch.
+    The boxes are fixed, so text detection is skipped: the preprocessed crops are
+    stacked on one canvas, cut into recognizer lines and decoded by a single
+    `get_text` call. (`Reader.recognize` would decode them one by one on CPU.)
+    Returns {key: [text, ...]}, or None if recognition failed.
+    """
+    processed = {name: preprocess_for_ocr(region) for name, region in regions.items()}
+    gap = 8
+    width = max(p.shape[1] for p in processed.values())
+    height = sum(p.shape[0] + gap for p in processed.values())
+    canvas = np.zeros((height, width), dtype=np.uint8)
+
+    boxes = []
+    names_by_top = {}
+    y = 0
+    for name, p in processed.items():
+        h, w = p.shape[:2]
+        canvas[y:y + h, :w] = p
+        boxes.append([0, w, y, y + h])
+        names_by_top[y] = name
+        y += h + gap
+
+    try:
+        from easyocr.config import imgH
+        from easyocr.recognition import get_text
+        from easyocr.utils import get_image_list
+
+        reader = get_reader()
+        lines, max_width = get_image_list(boxes, [], canvas, model_height=imgH)
+        # Same character filter as Reader.recognize without an allowlist
+        ignore_char = "".join(set(reader.character) - set(reader.lang_char))
+        with _inference_lock:
+            results = get_text(
+                reader.character, imgH, int(max_width), reader.recognizer, reader.converter, lines,
+                ignore_char, batch_size=len(lines), workers=0, device=reader.device,
+            )
+    except Exception:
+        return None
 
-    return {"gold": gold_value, "elixir": elixir_value, "dark_elixir": dark_value}
+    texts = {name: [] for name in regions}
+    for box, text, _ in results:
+        top = int(min(point[1] for point in box))
+        name = names_by_top.get(top)
+        if name is None:
+            # Map by the nearest stacked row if EasyOCR adjusted the box
+            name = names_by_top[min(names_by_top, key=lambda t: abs(t - top))]
+        texts[name].append(text)
+    return texts
 
 
 if __name__ == "__main__":